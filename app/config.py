@@ -20,6 +20,74 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
+# Models are loaded lazily on first use; list names here (comma separated,
+# or "ALL") to load them at startup instead.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "")
+MODEL_VERSION = os.getenv("MODEL_VERSION", "v2")
+# "prefork" loads PREFORK_PRELOAD once and forks WEB_WORKERS (see app/prefork.py)
+SERVER_MODE = os.getenv("SERVER_MODE", "dev")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))
+# Defaults to the joblib models; TF models are only preloaded in fork-safe builds
+PREFORK_PRELOAD = os.getenv("PREFORK_PRELOAD", "SVM,MNB,Random Forest,AdaBoost,KNN,XG_BOOST")
+# Memory-map joblib models from DATA_DIR/mmap (python -m app.services.loader --export-mmap)
+MODEL_MMAP = os.getenv("MODEL_MMAP", "false").lower() in ("1", "true", "yes")
+# BERT runtime: "tf" (TFBertForSequenceClassification) or "onnx" (onnxruntime)
+BERT_BACKEND = os.getenv("BERT_BACKEND", "tf").lower()
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", str(os.cpu_count() or 1)))
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "1"))
+# Serve the array-backed TF-IDF vectorizer (python -m app.services.compact_tfidf)
+# to the models it was built for; the rest keep the original
+TFIDF_COMPACT = os.getenv("TFIDF_COMPACT", "false").lower() in ("1", "true", "yes")
+# KNN lookup: "brute" (original model) or "ivf" (python -m app.services.knn_index)
+KNN_BACKEND = os.getenv("KNN_BACKEND", "brute").lower()
+# Serve the int8 builds (python -m app.services.quantize) for these models
+QUANTIZED_MODELS = [m.strip() for m in os.getenv("QUANTIZED_MODELS", "").split(",") if m.strip()]
+# ALL-model predictions fan out to thread pools instead of running in sequence
+PREDICT_PARALLEL = os.getenv("PREDICT_PARALLEL", "true").lower() in ("1", "true", "yes")
+PREDICT_BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", "256"))
+# Largest forward pass the neural models (BERT, BiLSTM, Feedforward NN) get;
+# bigger batches run in chunks of this size
+PREDICT_CHUNK_SIZE = int(os.getenv("PREDICT_CHUNK_SIZE", "32"))
+PREDICT_CPU_WORKERS = int(os.getenv("PREDICT_CPU_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Concurrent single-abstract requests for these models share forward passes
+MICROBATCH_MODELS = [m.strip() for m in os.getenv("MICROBATCH_MODELS", "BERT,BiLSTM").split(",") if m.strip()]
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "16"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "5"))
+# Bounded executors for blocking work: workers = concurrent calls,
+# queue = extra calls allowed to wait before requests get a 503
+MODEL_POOL_WORKERS = int(os.getenv("MODEL_POOL_WORKERS", "4"))
+MODEL_POOL_QUEUE = int(os.getenv("MODEL_POOL_QUEUE", "32"))
+PDF_POOL_WORKERS = int(os.getenv("PDF_POOL_WORKERS", "2"))
+PDF_POOL_QUEUE = int(os.getenv("PDF_POOL_QUEUE", "8"))
+# PDF parsing runs in worker processes with a per-document time and memory budget
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", "20"))
+PDF_MEMORY_LIMIT_MB = int(os.getenv("PDF_MEMORY_LIMIT_MB", "1024"))
+# PDF text backend: auto | pypdfium2 | pdfminer | pypdf2; pages read at most
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto").lower()
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "2"))
+# Uploads: hard size cap, and the size past which they are spooled to disk
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(2 * 1024 * 1024)))
+PDF_TEXT_CACHE_SIZE = int(os.getenv("PDF_TEXT_CACHE_SIZE", "256"))
+PDF_TEXT_CACHE_TTL = int(os.getenv("PDF_TEXT_CACHE_TTL", "1800"))
+LLM_POOL_WORKERS = int(os.getenv("LLM_POOL_WORKERS", "8"))
+LLM_POOL_QUEUE = int(os.getenv("LLM_POOL_QUEUE", "32"))
+# Classification result cache (in-memory LRU, optional Mongo second tier)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL = int(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+PREDICTION_CACHE_MONGO = os.getenv("PREDICTION_CACHE_MONGO", "false").lower() in ("1", "true", "yes")
+PREDICTION_CACHE_MONGO_TTL = int(os.getenv("PREDICTION_CACHE_MONGO_TTL", str(7 * 24 * 3600)))
+# Keyword components to build in the background at startup: keybert, gemini
+# (otherwise each loads on first use)
+KEYWORD_WARMUP = [c.strip() for c in os.getenv("KEYWORD_WARMUP", "").split(",") if c.strip()]
+# KeyBERT embedding backbone, see KEYBERT_BACKBONES in app/services/keyword_extractor.py
+KEYBERT_BACKBONE = os.getenv("KEYBERT_BACKBONE", "mpnet")
+# KeyBERT candidate-phrase embeddings: LRU over an on-disk float16 matrix
+KEYBERT_CACHE_SIZE = int(os.getenv("KEYBERT_CACHE_SIZE", "100000"))
+KEYBERT_CACHE_DIR = Path(os.getenv("KEYBERT_CACHE_DIR", str(DATA_DIR / "keybert_cache")))
+KEYBERT_ENCODE_BATCH = int(os.getenv("KEYBERT_ENCODE_BATCH", "64"))
+KEYWORD_BATCH_MAX = int(os.getenv("KEYWORD_BATCH_MAX", "256"))
+
 
 client = AsyncIOMotorClient(MONGO_URI,server_api = ServerApi("1"))
 db=  client[DB_NAME]
\ No newline at end of file
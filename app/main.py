@@ -1,7 +1,15 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import predict, auth, dashboard,  faculty_scrape,faculty_scrape_db
+from app.routes import predict, auth, dashboard,  faculty_scrape,faculty_scrape_db, metrics, health
 from app.middlewares.user_protect import userProtect
+from app.middlewares.upload_limit import limitUploadSize
+from app.services.loader import warm_up
+from app.services.executor import pools
+from app.services.predictor import prediction_cache
+from app.services.metrics import register_runtime_gauges
+from app.services import keyword_extractor
 import os
 from dotenv import load_dotenv
 
@@ -17,18 +25,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"], 
+    expose_headers=["Content-Disposition", *predict.KEYWORD_BATCH_HEADERS],
 )
 
 # Middleware for /dashboard/*
 app.middleware("http")(userProtect)
 
+# Early 413 for oversized uploads
+app.middleware("http")(limitUploadSize)
+
 # Routers
 app.include_router(predict.router, prefix="/api", tags=["Prediction"])
 app.include_router(auth.router, prefix="/api", tags=["Auth"])
 app.include_router(dashboard.router, prefix="/api", tags=["Dashboard"])
 app.include_router(faculty_scrape.router, prefix="/api", tags=["Agent"])
 app.include_router(faculty_scrape_db.router, prefix="/api", tags=["Faculty"])
+app.include_router(metrics.router, tags=["Metrics"])
+app.include_router(health.router, tags=["Health"])
+
+register_runtime_gauges(pools, {
+    "prediction": prediction_cache.memory,
+    "pdf_text": predict.pdf_text_cache,
+    "keybert_phrases": keyword_extractor.phrase_cache,
+})
+
+
+@app.on_event("startup")
+async def warm_up_models():
+    # No-op unless MODEL_WARMUP is set
+    warmed = await run_in_threadpool(warm_up)
+    if warmed:
+        print(f"[startup] warmed models: {', '.join(warmed)}")
+
+
+async def _warm_up_keywords():
+    warmed = await run_in_threadpool(keyword_extractor.warm_up)
+    if warmed:
+        print(f"[startup] warmed keyword components: {', '.join(warmed)}")
+
+
+@app.on_event("startup")
+async def warm_up_keywords():
+    # Runs in the background: the server starts accepting requests right
+    # away and /ready reports the components as "loading" until done
+    if keyword_extractor.KEYWORD_WARMUP:
+        app.state.keyword_warmup = asyncio.create_task(_warm_up_keywords())
 
 
 @app.get("/")
@@ -0,0 +1,21 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from app.config import UPLOAD_MAX_BYTES
+from app.utils.uploads import CHUNK_SIZE
+
+async def limitUploadSize(request: Request, call_next):
+    # Reject oversized multipart bodies from Content-Length, before Starlette
+    # parses (and buffers) the form. spool_upload still counts the real bytes.
+    content_length = request.headers.get("content-length")
+    if (
+        content_length
+        and content_length.isdigit()
+        and request.headers.get("content-type", "").startswith("multipart/form-data")
+        # headroom for the other form fields and boundaries
+        and int(content_length) > UPLOAD_MAX_BYTES + CHUNK_SIZE
+    ):
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload exceeds {UPLOAD_MAX_BYTES // (1024 * 1024)} MB limit."},
+        )
+    return await call_next(request)
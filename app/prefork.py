@@ -0,0 +1,149 @@
+"""
+Pre-fork server mode: load the models once in a parent process, then fork
+the uvicorn workers so they share those pages copy-on-write.
+
+    SERVER_MODE=prefork WEB_WORKERS=8 python run.py
+
+The parent binds the socket, loads PREFORK_PRELOAD through the model
+registry, runs a full collection and calls gc.freeze() so the cyclic GC in
+the children never touches (and therefore never copies) objects that existed
+before the fork. Each worker logs its shared vs private memory once it has
+started.
+
+The parent never imports app.main (or the predictor): that would build the
+summarizer pipelines and the executor pools (and initialize CUDA) before
+the fork. Each child imports the app
+itself and reuses the registry the parent filled. TensorFlow is not
+fork-safe either, so the Keras / TF-BERT models are never preloaded; BERT
+is allowed with BERT_BACKEND=onnx, and any TF model whose int8 build is
+selected in QUANTIZED_MODELS. Refused models load lazily in each worker.
+"""
+import gc
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from app.config import BERT_BACKEND, PREFORK_PRELOAD, QUANTIZED_MODELS
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def memory_report(pid="self") -> dict | None:
+    """Shared vs private memory from /proc/<pid>/smaps_rollup (Linux only), in MB."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    kb = {}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in SMAPS_FIELDS:
+            kb[name] = int(rest.split()[0])
+    return {
+        "rss_mb": round(kb.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(kb.get("Pss", 0) / 1024, 1),
+        "shared_mb": round((kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)) / 1024, 1),
+        "private_mb": round((kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def fork_safe(model_name: str) -> bool:
+    """Whether a model can be loaded in the parent and inherited by forked workers."""
+    # From the loader, not the predictor: importing the predictor builds the
+    # executor pools, which must not exist before the fork
+    from app.services.loader import TF_MODELS
+
+    if model_name not in TF_MODELS:
+        return True
+    if model_name == "BERT" and BERT_BACKEND == "onnx":
+        return True
+    return model_name in QUANTIZED_MODELS
+
+
+def _run_worker(sock, host, port):
+    from app.main import app
+
+    async def report_memory():
+        print(f"[prefork] worker {os.getpid()} memory: {memory_report()}")
+
+    app.router.on_startup.append(report_memory)
+    config = uvicorn.Config(app, host=host, port=port, workers=1)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve_prefork(host: str = "0.0.0.0", port: int = 8000, workers: int = 2):
+    sock = _bind(host, port)
+
+    from app.services.loader import warm_up, warmup_targets
+
+    names = warmup_targets(PREFORK_PRELOAD)
+    refused = [name for name in names if not fork_safe(name)]
+    if refused:
+        print(f"[prefork] not preloading {refused}: TensorFlow is not fork-safe "
+              f"(use BERT_BACKEND=onnx or QUANTIZED_MODELS); they load in each worker")
+
+    started = time.perf_counter()
+    warmed = warm_up([name for name in names if name not in refused])
+    print(f"[prefork] parent {os.getpid()} loaded {warmed} in {time.perf_counter() - started:.1f}s")
+
+    # Move everything allocated so far into the permanent generation so the
+    # children's GC never writes to those object headers
+    gc.collect()
+    gc.freeze()
+    print(f"[prefork] parent memory: {memory_report()}")
+
+    children = {}
+    shutting_down = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                _run_worker(sock, host, port)
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.pop(pid, None)
+        if not shutting_down:
+            print(f"[prefork] worker {pid} exited with status {status}, restarting")
+            spawn()
+
+    sock.close()
@@ -4,6 +4,7 @@ from app.db import get_db
 from app.services.b2 import upload_file, download_file, delete_file
 from app.core.auth import get_current_user
 from app.schemas.paper import PaperBase
+from app.utils.uploads import spool_upload
 from bson import ObjectId
 import tempfile, os
 from bson import objectid
@@ -31,15 +32,11 @@ async def create_paper(
     user=Depends(get_current_user),
     db=Depends(get_db)
 ):
-    # Save file temporarily
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
-
-    # Upload to B2
-    key = f"papers/{user}/{file.filename}"
-    file_url = upload_file(os.getenv("B2_BUCKET"), key, tmp_path)
-    os.remove(tmp_path)
+    # Stream to a temp file in chunks (size-capped) instead of reading it whole
+    with await spool_upload(file, memory_threshold=0) as upload:
+        # Upload to B2
+        key = f"papers/{user}/{file.filename}"
+        file_url = upload_file(os.getenv("B2_BUCKET"), key, upload.path())
 
     # Document for Mongo
     paper_doc = {
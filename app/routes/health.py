@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Response
+from app.services import keyword_extractor, loader
+
+router = APIRouter()
+
+
+@router.get("/ready")
+def ready(response: Response):
+    """
+    Readiness per component. Only what is configured for warm-up
+    (MODEL_WARMUP, KEYWORD_WARMUP) has to be loaded; everything else is
+    lazy and fine to load on first use. 503 until the required parts are ready.
+    """
+    components = {"models": loader.status(), **keyword_extractor.status()}
+    required = [components["models"]] + [c for c in components.values() if c.get("warmup")]
+    is_ready = all(c["status"] == "ready" for c in required)
+    if not is_ready:
+        response.status_code = 503
+    return {"ready": is_ready, "components": components}
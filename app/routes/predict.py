@@ -1,36 +1,89 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from PyPDF2 import PdfReader
+import asyncio
+import time
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Response
 from app.schemas.predict import (
     PredictRequest,
     PredictResponse,
     AllModelsResponse,
+    BatchPredictRequest,
+    BatchPredictResponse,
     SingleModelPrediction,
     UnifiedResponse,
     KeywordRequest,
     KeywordResponse,
     KeywordTextRequest,
+    KeywordBatchRequest,
+    KeywordBatchResponse,
     SummaryRequest,
-    SummaryResponse
+    SummaryResponse,
+    AnalyzePdfResponse
 )
-from typing import Union
+from typing import Literal, Union
 from fastapi.responses import JSONResponse
-from app.services.loader import load_all_models
-from app.services.predictor import predict_label
-from app.services.keyword_extractor import (extract_keywords_keybert,extract_keywords_gemini)
+from app.services.loader import models, tokenizers, get_label_encoder
+from app.services.predictor import predict_label_async, prediction_cache, predict_labels_batch
+from app.services.executor import run_in_pool, PoolSaturated, TaskTimeout, WorkerCrashed
+from app.services.pdf_extract import extract_pdf_text
+from app.services.cache import TTLCache
+from app.utils.uploads import spool_upload
+from app.config import PREDICT_BATCH_MAX, KEYWORD_BATCH_MAX, PDF_TEXT_CACHE_SIZE, PDF_TEXT_CACHE_TTL
+from app.services.keyword_extractor import (extract_keywords_keybert,extract_keywords_keybert_batch,extract_keywords_gemini)
 from app.services.summarizer import summarize_with_gemini, summarize_with_bart,summarize_with_pegasus
 
 router =APIRouter()
 
-models,tokenizers, label_encoder,tfidf_vectorizer = load_all_models()
+# Registries load each model on first request (see MODEL_WARMUP for preloading)
+
+# Throughput headers of /extract_keywords_batch; exposed to the frontend
+# through CORS in app/main.py
+KEYWORD_BATCH_HEADERS = (
+    "X-Documents",
+    "X-Candidates",
+    "X-Filtered-Candidates",
+    "X-Encoded-Phrases",
+    "X-Elapsed-Ms",
+    "X-Docs-Per-Second",
+)
+
+# Extracted text by file hash, so the same upload sent to several PDF
+# endpoints is only parsed once
+pdf_text_cache = TTLCache(maxsize=PDF_TEXT_CACHE_SIZE, ttl=PDF_TEXT_CACHE_TTL)
+
+
+async def _read_pdf(pdf_file: UploadFile) -> tuple[str, str]:
+    """
+    Returns (sha256 of the file, extracted text). The upload is streamed in
+    chunks (spooled to disk past UPLOAD_SPOOL_THRESHOLD) and hashed on the way;
+    the "pdf" process pool gets bytes or the spool path. Bad documents become 422s.
+    """
+    with await spool_upload(pdf_file) as upload:
+        text = pdf_text_cache.get(upload.sha256)
+        if text is not None:
+            return upload.sha256, text
+
+        try:
+            text = await run_in_pool("pdf", extract_pdf_text, upload.source())
+        except TaskTimeout:
+            raise HTTPException(status_code=422, detail="PDF took too long to parse.")
+        except (WorkerCrashed, MemoryError):
+            raise HTTPException(status_code=422, detail="PDF is too large or malformed to parse.")
+        pdf_text_cache.set(upload.sha256, text)
+        return upload.sha256, text
+
+
+async def _read_pdf_text(pdf_file: UploadFile) -> str:
+    _, text = await _read_pdf(pdf_file)
+    return text
+
 
 @router.post("/predict", response_model=Union[PredictResponse, AllModelsResponse])
-def predict(request: PredictRequest):
+async def predict(request: PredictRequest):
     if request.model_name != "ALL" and request.model_name not in models:
         raise HTTPException(status_code=400, detail="Model Not Found")
 
     try:
-        output, confidence = predict_label(
-            request.abstract, request.model_name, models, tokenizers, label_encoder
+        output, confidence = await predict_label_async(
+            request.abstract, request.model_name, models, tokenizers, get_label_encoder()
         )
 
         # Single model
@@ -40,10 +93,58 @@ def predict(request: PredictRequest):
         # ALL models — return raw dict
         return {"predictions": output}
 
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/predict/cache")
+async def prediction_cache_stats():
+    return prediction_cache.stats()
+
+
+@router.post("/predict/batch", response_model=BatchPredictResponse)
+async def predict_batch(request: BatchPredictRequest):
+    if request.model_name != "ALL" and request.model_name not in models:
+        raise HTTPException(status_code=400, detail="Model Not Found")
+    if not request.abstracts:
+        raise HTTPException(status_code=400, detail="No abstracts received.")
+    if len(request.abstracts) > PREDICT_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {PREDICT_BATCH_MAX} abstracts)."
+        )
+
+    try:
+        outputs = await run_in_pool(
+            "model",
+            predict_labels_batch,
+            request.abstracts, request.model_name, models, tokenizers, get_label_encoder()
+        )
+
+        if request.model_name != "ALL":
+            return {"results": [
+                PredictResponse(predicted_label=label, confidence=confidence)
+                for label, confidence in outputs
+            ]}
+
+        return {"results": [{"predictions": output} for output in outputs]}
+
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _classification_response(model_name, result):
+    if model_name == "ALL":
+        predictions, _ = result
+        return AllModelsResponse(predictions=predictions)
+    label, confidence = result
+    return PredictResponse(predicted_label=label, confidence=confidence)
+
+
 @router.post("/predict-pdf", response_model=UnifiedResponse)
 async def predict_from_pdf( pdf_file: UploadFile = File(...),model_name:str = Form(...) ):
     # Validate model
@@ -51,53 +152,97 @@ async def predict_from_pdf( pdf_file: UploadFile = File(...),model_name:str = Fo
         raise HTTPException(status_code=400, detail="Model Not Found")
 
     try:
-        contents = await pdf_file.read()
-        pdf = PdfReader(pdf_file.file)
-        abstract=""
-        
-        for page in pdf.pages[:2]:  # First 2 pages typically include abstract
-            abstract += page.extract_text() or ""
+        abstract = await _read_pdf_text(pdf_file)
 
         if not abstract.strip():
             raise HTTPException(status_code=400, detail="No text extracted from PDF.")
 
         # Predict
-        result = predict_label(abstract, model_name, models, tokenizers, label_encoder)
-
-        if model_name == "ALL":
-            predictions, _ = result
-            return UnifiedResponse(
-                abstract=abstract.strip(),
-                result=AllModelsResponse(predictions=predictions)
-            )
-        else:
-            label, confidence = result
-            return UnifiedResponse(
-                abstract=abstract.strip(),
-                result=PredictResponse(predicted_label=label, confidence=confidence)
-            )
+        result = await predict_label_async(abstract, model_name, models, tokenizers, get_label_encoder())
 
+        return UnifiedResponse(
+            abstract=abstract.strip(),
+            result=_classification_response(model_name, result)
+        )
+
+    except HTTPException:
+        raise
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/analyze-pdf", response_model=AnalyzePdfResponse)
+async def analyze_pdf(
+    pdf_file: UploadFile = File(...),
+    model_name: str = Form("ALL"),
+    top_n: int = Form(10),
+    summary_model: Literal["bart", "gemini", "none"] = Form("bart"),
+):
+    """
+    Extract the PDF text once, then classify, extract keywords and summarize
+    concurrently. A failing step is reported in `errors` without failing the
+    other results.
+    """
+    if model_name != "ALL" and model_name not in models:
+        raise HTTPException(status_code=400, detail="Model Not Found")
+
+    try:
+        file_hash, text = await _read_pdf(pdf_file)
+    except HTTPException:
+        raise
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    abstract = text.strip()
+    if not abstract:
+        raise HTTPException(status_code=400, detail="No text extracted from PDF.")
+
+    tasks = {
+        "classification": predict_label_async(abstract, model_name, models, tokenizers, get_label_encoder()),
+        "keywords": run_in_pool("model", extract_keywords_keybert, abstract, top_n),
+    }
+    if summary_model == "gemini":
+        tasks["summary"] = run_in_pool("llm", summarize_with_gemini, abstract)
+    elif summary_model == "bart":
+        tasks["summary"] = run_in_pool("model", summarize_with_bart, abstract)
+
+    outcomes = dict(zip(tasks, await asyncio.gather(*tasks.values(), return_exceptions=True)))
+    errors = {name: str(outcome) for name, outcome in outcomes.items() if isinstance(outcome, Exception)}
+    results = {name: outcome for name, outcome in outcomes.items() if name not in errors}
+
+    return AnalyzePdfResponse(
+        file_hash=file_hash,
+        abstract=abstract,
+        classification=_classification_response(model_name, results["classification"])
+        if "classification" in results else None,
+        keywords=results.get("keywords"),
+        summary=results.get("summary"),
+        errors=errors,
+    )
+
+
 @router.post("/extract_keywords_pdf", response_model=KeywordResponse)
 async def extract_keywords_from_pdf(
     pdf_file: UploadFile = File(...),
     top_n: int = Form(10)
 ):
     try:
-        pdf = PdfReader(pdf_file.file)
-        text = ""
-        for page in pdf.pages[:2]:  # Assume abstract is early
-            text += page.extract_text() or ""
+        text = await _read_pdf_text(pdf_file)
 
         if not text.strip():
             raise HTTPException(status_code=400, detail="No text extracted from PDF.")
 
-        keywords = extract_keywords_keybert(text,  top_n)
+        keywords = await run_in_pool("model", extract_keywords_keybert, text, top_n)
         return {"keywords": keywords}
 
+    except HTTPException:
+        raise
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -110,35 +255,81 @@ async def extract_keywords_from_text(payload: KeywordTextRequest):
         if not payload.abstract.strip():
             raise HTTPException(status_code=400, detail="Empty abstract received.")
 
-        keywords = extract_keywords_keybert(payload.abstract, top_n=payload.top_n)
+        keywords = await run_in_pool("model", extract_keywords_keybert, payload.abstract, top_n=payload.top_n)
         return {"keywords": keywords}
 
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@router.post("/extract_keywords_batch", response_model=KeywordBatchResponse)
+async def extract_keywords_batch(payload: KeywordBatchRequest, response: Response):
+    """
+    KeyBERT keywords for many abstracts in one call. Throughput is reported
+    in X-Documents, X-Candidates, X-Filtered-Candidates, X-Encoded-Phrases,
+    X-Elapsed-Ms and X-Docs-Per-Second.
+    """
+    if not payload.abstracts:
+        raise HTTPException(status_code=400, detail="No abstracts received.")
+    if len(payload.abstracts) > KEYWORD_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {KEYWORD_BATCH_MAX} abstracts)."
+        )
+    if payload.titles is not None and len(payload.titles) != len(payload.abstracts):
+        raise HTTPException(status_code=400, detail="titles must match abstracts in length.")
+
+    try:
+        start = time.perf_counter()
+        results, stats = await run_in_pool(
+            "model",
+            extract_keywords_keybert_batch,
+            payload.abstracts, payload.top_n, payload.titles, with_stats=True
+        )
+        elapsed = time.perf_counter() - start
+
+        response.headers["X-Documents"] = str(stats["documents"])
+        response.headers["X-Candidates"] = str(stats["candidates"])
+        response.headers["X-Filtered-Candidates"] = str(stats["filtered"])
+        response.headers["X-Encoded-Phrases"] = str(stats["encoded"])
+        response.headers["X-Elapsed-Ms"] = f"{elapsed * 1000:.1f}"
+        response.headers["X-Docs-Per-Second"] = f"{stats['documents'] / elapsed:.2f}" if elapsed else "0"
+        return {"results": results}
+
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/extract_keywords_gemini", response_model=KeywordResponse)
 async def extract_keywords_with_gemini(payload: KeywordTextRequest):
     try:
         if not payload.abstract.strip():
             raise HTTPException(status_code=400, detail="Empty abstract received.")
-        keywords = extract_keywords_gemini(payload.abstract, top_n=payload.top_n)
+        keywords = await run_in_pool("llm", extract_keywords_gemini, payload.abstract, top_n=payload.top_n)
         return {"keywords": keywords}
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
 @router.post("/summarize", response_model=SummaryResponse)
-def summarize(request: SummaryRequest):
+async def summarize(request: SummaryRequest):
     try:
         if request.model_name == "gemini":
-            summary = summarize_with_gemini(request.abstract)
+            summary = await run_in_pool("llm", summarize_with_gemini, request.abstract)
         elif request.model_name == "bart":
-            summary = summarize_with_bart(request.abstract)
+            summary = await run_in_pool("model", summarize_with_bart, request.abstract)
         else:
             raise HTTPException(status_code=400, detail="Unsupported model.")
         
         return {"summary": summary}
 
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
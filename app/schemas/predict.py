@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Union
+from typing import Optional, Dict, Union, List
 from pydantic import BaseModel
 from typing import Literal
 class SingleModelPrediction(BaseModel):
@@ -15,6 +15,13 @@ class PredictResponse(BaseModel):
 
 class AllModelsResponse(BaseModel):
     predictions: Dict[str, SingleModelPrediction]
+class BatchPredictRequest(BaseModel):
+    model_name: str
+    abstracts: List[str]
+
+class BatchPredictResponse(BaseModel):
+    results: List[Union[PredictResponse, AllModelsResponse]]
+
 class UnifiedResponse(BaseModel):
     abstract: str
     result: Union[PredictResponse, AllModelsResponse]
@@ -30,6 +37,14 @@ class KeywordTextRequest(BaseModel):
     abstract: str
     top_n: Optional[int] = 5
 
+class KeywordBatchRequest(BaseModel):
+    abstracts: List[str]
+    titles: Optional[List[Optional[str]]] = None
+    top_n: Optional[int] = 5
+
+class KeywordBatchResponse(BaseModel):
+    results: List[List[str]]
+
 class SummaryRequest(BaseModel):
     abstract: str
     model_name: Literal["gemini", "bart"]
@@ -37,3 +52,10 @@ class SummaryRequest(BaseModel):
 class SummaryResponse(BaseModel):
     summary: str
 
+class AnalyzePdfResponse(BaseModel):
+    file_hash: str
+    abstract: str
+    classification: Optional[Union[PredictResponse, AllModelsResponse]] = None
+    keywords: Optional[List[str]] = None
+    summary: Optional[str] = None
+    errors: Dict[str, str] = {}
@@ -0,0 +1,45 @@
+"""
+Helpers for the arXiv metadata snapshot (JSON lines, one paper per line;
+fields listed in dataset_info.txt: id, title, abstract, categories, ...).
+"""
+import json
+
+
+def iter_arxiv_records(path, start_offset: int = 0, limit: int = None, sample_every: int = 1):
+    """
+    Stream (byte_offset_after_line, record) pairs without loading the dump.
+    The offset can be stored as a checkpoint and passed back as
+    `start_offset` to resume. `sample_every=k` keeps every k-th record.
+    """
+    yielded = 0
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        for index, line in enumerate(iter(f.readline, b"")):
+            if index % sample_every:
+                continue
+            offset = f.tell()
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[arxiv] skipping malformed line before offset {offset}")
+                continue
+            if not record.get("abstract"):
+                continue
+            yield offset, record
+            yielded += 1
+            if limit and yielded >= limit:
+                return
+
+
+def clean_abstract(text: str) -> str:
+    # arXiv abstracts are hard-wrapped with newlines
+    return " ".join(text.split())
+
+
+def matching_label(categories: str, classes) -> str | None:
+    """First arXiv category (space separated) that the label encoder knows."""
+    classes = set(classes)
+    return next((c for c in (categories or "").split() if c in classes), None)
@@ -0,0 +1,189 @@
+"""
+Bulk-classify the arXiv metadata snapshot into Mongo.
+
+    python -m app.services.arxiv_ingest arxiv-metadata-oai-snapshot.json \
+        --models SVM "Random Forest" BERT --batch-size 64 --workers 4
+
+The dump is streamed line by line and never held in memory. Batches of
+abstracts go to a process pool, where each worker loads the models once and
+runs every model over the batch in one vectorized call. Results are
+bulk-upserted into the `arxiv_predictions` collection keyed by arXiv id.
+The byte offset of the last contiguous finished batch is checkpointed, so a
+rerun with the same checkpoint file resumes where the previous one stopped.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+from app.config import DATA_DIR, DB_NAME, MONGO_URI
+from app.services.arxiv import clean_abstract, iter_arxiv_records
+from app.services.predictor import TFIDF_MODELS
+
+DEFAULT_MODELS = TFIDF_MODELS + ["BERT"]
+DEFAULT_CHECKPOINT = DATA_DIR / "arxiv_ingest.checkpoint.json"
+
+
+def iter_batches(path, start_offset: int, batch_size: int, limit: int = None):
+    """Yield (end_offset, rows) where rows are the fields we keep per paper."""
+    rows = []
+    offset = start_offset
+    for offset, record in iter_arxiv_records(path, start_offset=start_offset, limit=limit):
+        rows.append({
+            "_id": record["id"],
+            "title": clean_abstract(record.get("title", "")),
+            "abstract": clean_abstract(record["abstract"]),
+            "categories": record.get("categories", ""),
+            "update_date": record.get("update_date"),
+        })
+        if len(rows) >= batch_size:
+            yield offset, rows
+            rows = []
+    if rows:
+        yield offset, rows
+
+
+# ---- worker side -------------------------------------------------------
+
+def _init_worker(model_names):
+    from app.services.loader import warm_up
+    warm_up(model_names)
+
+
+def classify_rows(model_names, rows):
+    from app.services.loader import models, tokenizers, get_label_encoder
+    from app.services.predictor import predict_labels_batch
+
+    # One process per core already; don't fan out to threads as well
+    predictions = predict_labels_batch(
+        [row["abstract"] for row in rows], list(model_names),
+        models, tokenizers, get_label_encoder(), parallel=False,
+    )
+    now = datetime.utcnow()
+    docs = []
+    for row, per_model in zip(rows, predictions):
+        doc = {key: value for key, value in row.items() if key != "abstract"}
+        doc["predictions"] = {
+            name: {"label": str(result["label"]), "confidence": result["confidence"]}
+            if "label" in result else result
+            for name, result in per_model.items()
+        }
+        doc["classified_at"] = now
+        docs.append(doc)
+    return docs
+
+
+# ---- driver side -------------------------------------------------------
+
+def load_checkpoint(path: Path, data_path) -> dict:
+    if path.exists():
+        state = json.loads(path.read_text())
+        if state.get("data") == str(data_path):
+            return state
+        print(f"[ingest] checkpoint {path} belongs to {state.get('data')}, starting over")
+    return {"data": str(data_path), "offset": 0, "docs": 0}
+
+
+def save_checkpoint(path: Path, state: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def write_docs(collection, docs):
+    from pymongo import UpdateOne
+
+    if not docs:
+        return
+    collection.bulk_write(
+        [UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True) for doc in docs],
+        ordered=False,
+    )
+
+
+def ingest(data_path, model_names, batch_size=64, workers=1, checkpoint=DEFAULT_CHECKPOINT,
+           collection_name="arxiv_predictions", limit=None):
+    from pymongo import MongoClient
+    from pymongo.server_api import ServerApi
+
+    collection = MongoClient(MONGO_URI, server_api=ServerApi("1"))[DB_NAME][collection_name]
+    checkpoint = Path(checkpoint)
+    state = load_checkpoint(checkpoint, data_path)
+    print(f"[ingest] starting at offset {state['offset']} ({state['docs']} docs done)")
+
+    batches = iter_batches(data_path, state["offset"], batch_size, limit)
+    started = time.perf_counter()
+    done_this_run = 0
+
+    def report(docs):
+        nonlocal done_this_run
+        done_this_run += docs
+        rate = done_this_run / (time.perf_counter() - started)
+        print(f"[ingest] {state['docs']} docs, offset {state['offset']} ({rate:.1f} docs/s)")
+
+    if workers <= 1:
+        _init_worker(model_names)
+        for end_offset, rows in batches:
+            write_docs(collection, classify_rows(model_names, rows))
+            state["offset"], state["docs"] = end_offset, state["docs"] + len(rows)
+            save_checkpoint(checkpoint, state)
+            report(len(rows))
+        return state
+
+    # Batches finish out of order; only advance the checkpoint past a batch
+    # once every batch before it has been written
+    pending, finished = {}, {}
+    next_seq, commit_seq = 0, 0
+    max_in_flight = workers * 2
+    # spawn: TF state must not be inherited through fork
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(model_names,)) as pool:
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    end_offset, rows = next(batches)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future = pool.submit(classify_rows, model_names, rows)
+                pending[future] = (next_seq, end_offset, len(rows))
+                next_seq += 1
+            if not pending:
+                break
+
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                seq, end_offset, count = pending.pop(future)
+                write_docs(collection, future.result())
+                finished[seq] = (end_offset, count)
+
+            while commit_seq in finished:
+                end_offset, count = finished.pop(commit_seq)
+                state["offset"], state["docs"] = end_offset, state["docs"] + count
+                commit_seq += 1
+                report(count)
+            save_checkpoint(checkpoint, state)
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", help="arXiv metadata JSON-lines file")
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--checkpoint", default=str(DEFAULT_CHECKPOINT))
+    parser.add_argument("--collection", default="arxiv_predictions")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many records")
+    args = parser.parse_args()
+
+    final = ingest(args.data, args.models, args.batch_size, args.workers,
+                   args.checkpoint, args.collection, args.limit)
+    print(f"[ingest] finished: {final['docs']} docs, offset {final['offset']}")
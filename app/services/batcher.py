@@ -0,0 +1,64 @@
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item requests into small batches.
+
+    Callers `await submit(item)`. A background task waits for the first item,
+    keeps collecting for up to `max_wait_ms` (or until `max_batch_size` items
+    are queued), runs `fn(items)` once in `executor`, and resolves each
+    caller's future with its own entry of the returned list.
+    """
+
+    def __init__(self, fn, max_batch_size: int = 16, max_wait_ms: float = 5, executor=None, name: str = "batcher"):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.name = name
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        # The queue and worker belong to the running loop; recreate them if the
+        # loop changed (e.g. uvicorn --reload or tests starting a new loop)
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():  # caller may have been cancelled
+                    future.set_result(result)
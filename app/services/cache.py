@@ -0,0 +1,287 @@
+import atexit
+import fcntl
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live. Least recently used
+    entries are evicted once `maxsize` is reached; expired entries are dropped
+    when they are next read.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PredictionCache:
+    """
+    Two-tier cache for classification results keyed by
+    (sha256(abstract), model_name, model version).
+
+    Tier 1 is an in-process TTLCache. Tier 2 is an optional Mongo collection
+    (motor) so results survive restarts and are shared between workers; a
+    tier-2 hit is promoted into tier 1.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, collection=None, mongo_ttl: float = None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.collection = collection
+        self.mongo_ttl = mongo_ttl
+        self.mongo_hits = 0
+        self.mongo_misses = 0
+        self._index_ready = False
+
+    @staticmethod
+    def make_key(abstract: str, model_name: str, version: str) -> str:
+        return f"{text_hash(abstract)}:{model_name}:{version}"
+
+    async def _ensure_index(self):
+        if self._index_ready or not self.mongo_ttl:
+            return
+        await self.collection.create_index("created_at", expireAfterSeconds=int(self.mongo_ttl))
+        self._index_ready = True
+
+    async def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or self.collection is None:
+            return value
+        try:
+            doc = await self.collection.find_one({"_id": key})
+        except Exception as e:
+            print("[PredictionCache] mongo read failed:", e)
+            return None
+        if doc is None:
+            self.mongo_misses += 1
+            return None
+        self.mongo_hits += 1
+        self.memory.set(key, doc["result"])
+        return doc["result"]
+
+    async def set(self, key, value):
+        self.memory.set(key, value)
+        if self.collection is None:
+            return
+        try:
+            await self._ensure_index()
+            await self.collection.replace_one(
+                {"_id": key},
+                {"_id": key, "result": value, "created_at": datetime.utcnow()},
+                upsert=True,
+            )
+        except Exception as e:
+            print("[PredictionCache] mongo write failed:", e)
+
+    def stats(self) -> dict:
+        stats = self.memory.stats()
+        if self.collection is not None:
+            stats["mongo_hits"] = self.mongo_hits
+            stats["mongo_misses"] = self.mongo_misses
+        return stats
+
+
+def _fingerprint(phrase: str) -> int:
+    return int.from_bytes(hashlib.blake2b(phrase.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU of phrase -> embedding. Vectors live in an on-disk
+    float16 matrix (np.memmap) rather than the Python heap, and the
+    phrase -> row index is pickled next to it on flush(), so the cache
+    survives restarts. A per-row phrase fingerprint drops index entries whose
+    row was reused after the last flush. Only one process can own the files;
+    any other (e.g. a second pre-fork worker) gets an in-memory matrix.
+    """
+
+    def __init__(self, path, dim: int, maxsize: int = 100_000, flush_every: int = 1024):
+        self.path = Path(path)
+        self.dim = dim
+        self.maxsize = maxsize
+        self.flush_every = flush_every
+        self._rows = OrderedDict()  # phrase -> row, least recently used first
+        self._free = list(range(maxsize - 1, -1, -1))
+        self._lock = threading.Lock()
+        self._unflushed = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._open()
+
+    @property
+    def _index_path(self) -> Path:
+        return self.path.with_suffix(".index.pkl")
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.path.with_suffix(".lock"), "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            self.persistent = False
+            self._matrix = np.zeros((self.maxsize, self.dim), dtype=np.float16)
+            self._keys = np.zeros(self.maxsize, dtype=np.int64)
+            return
+
+        self.persistent = True
+        nbytes = self.maxsize * self.dim * np.dtype(np.float16).itemsize
+        reuse = (
+            self.path.exists() and self.path.stat().st_size == nbytes
+            and self._index_path.exists() and self.path.with_suffix(".keys").exists()
+        )
+        self._matrix = np.memmap(self.path, dtype=np.float16, mode="r+" if reuse else "w+",
+                                 shape=(self.maxsize, self.dim))
+        self._keys = np.memmap(self.path.with_suffix(".keys"), dtype=np.int64, mode="r+" if reuse else "w+",
+                               shape=(self.maxsize,))
+        if reuse:
+            with open(self._index_path, "rb") as f:
+                self._rows = OrderedDict(
+                    (phrase, row) for phrase, row in pickle.load(f)
+                    if self._keys[row] == _fingerprint(phrase)
+                )
+            used = set(self._rows.values())
+            self._free = [row for row in range(self.maxsize - 1, -1, -1) if row not in used]
+        atexit.register(self.flush)
+
+    def get_many(self, phrases: list) -> tuple[np.ndarray, list]:
+        """Returns (float32 array aligned with `phrases`, positions that missed)."""
+        vectors = np.zeros((len(phrases), self.dim), dtype=np.float32)
+        positions, rows, missing = [], [], []
+        with self._lock:
+            for i, phrase in enumerate(phrases):
+                row = self._rows.get(phrase)
+                if row is None:
+                    missing.append(i)
+                    continue
+                self._rows.move_to_end(phrase)
+                positions.append(i)
+                rows.append(row)
+            if rows:
+                vectors[positions] = self._matrix[rows]
+            self.hits += len(rows)
+            self.misses += len(missing)
+        return vectors, missing
+
+    def set_many(self, phrases: list, vectors: np.ndarray):
+        with self._lock:
+            rows = []
+            for phrase in phrases:
+                row = self._rows.pop(phrase, None)
+                if row is None:
+                    if self._free:
+                        row = self._free.pop()
+                    else:
+                        _, row = self._rows.popitem(last=False)
+                        self.evictions += 1
+                self._rows[phrase] = row
+                rows.append(row)
+            self._matrix[rows] = np.asarray(vectors, dtype=np.float16)
+            self._keys[rows] = [_fingerprint(phrase) for phrase in phrases]
+            self._unflushed += len(rows)
+            if self._unflushed >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Flush, release the files and drop the exit-time flush (e.g. before deleting the directory)."""
+        with self._lock:
+            self._flush_locked()
+            atexit.unregister(self.flush)
+            if self._lock_file is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                self._lock_file.close()
+                self._lock_file = None
+            self.persistent = False
+
+    def _flush_locked(self):
+        self._unflushed = 0
+        if not self.persistent:
+            return
+        self._matrix.flush()
+        self._keys.flush()
+        tmp = self._index_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(list(self._rows.items()), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._index_path)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._rows),
+                "maxsize": self.maxsize,
+                "persistent": self.persistent,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
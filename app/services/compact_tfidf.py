@@ -0,0 +1,211 @@
+"""
+Compact replacement for the fitted TfidfVectorizer.
+
+    python -m app.services.compact_tfidf --check arxiv-sample.json
+
+It writes DATA_DIR/tfidf_vectorizer_light_v2.compact.pkl. With
+TFIDF_COMPACT=true the loader serves it to the --models it was built for
+(recorded in the pickle); every other model keeps the original vectorizer.
+
+The vocabulary dict (one Python str plus one int per term) becomes a sorted
+fixed-width bytes array plus an int32 column array, looked up with one
+np.searchsorted per transform() batch. This is a memory and load-time
+optimization: transform() is not faster than sklearn's per-token dict
+lookup (tokenization dominates both), so don't enable it for speed. The pickled `stop_words_` set is dropped; sklearn only
+keeps it for introspection. Features that no downstream classifier gives
+any weight are removed from the column mapping. Output keeps the original
+column count and order, so every model sees the same feature space.
+
+By default pruned terms stay in the lookup table with no output column, so
+they still count towards the row's L2 norm and the output matches the
+original vectorizer exactly. --drop-pruned removes them completely: smaller,
+but rows get renormalized over the kept terms only.
+"""
+import argparse
+import pickle
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from app.config import DATA_DIR
+
+TFIDF_SOURCE = "tfidf_vectorizer_light_v2.pkl"
+TFIDF_COMPACT = "tfidf_vectorizer_light_v2.compact.pkl"
+
+
+class CompactTfidfVectorizer:
+    """Transform-only TF-IDF vectorizer with an array-backed vocabulary."""
+
+    def __init__(self, params, terms, columns, idf, n_features, built_for=(), drop_pruned=False):
+        self.params = params
+        self.terms = terms            # sorted utf-8 bytes, dtype "S<n>"
+        self.columns = columns        # int32 output column per term, -1 = norm only
+        self.idf = idf                # float64 per term (aligned with terms)
+        self.n_features = n_features
+        self.built_for = list(built_for)  # models the pruning was checked against
+        self.drop_pruned = drop_pruned
+        self._build_analyzer()
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer, keep=None, keep_pruned_for_norm=True, built_for=()):
+        """
+        `keep` is a boolean mask over the original columns; False marks a
+        feature none of the `built_for` models uses. Column numbers are never
+        renumbered.
+        """
+        n_features = len(vectorizer.vocabulary_)
+        keep = np.ones(n_features, dtype=bool) if keep is None else np.asarray(keep, dtype=bool)
+
+        items = sorted((term.encode("utf-8"), col) for term, col in vectorizer.vocabulary_.items())
+        if not keep_pruned_for_norm:
+            items = [(term, col) for term, col in items if keep[col]]
+        terms = np.array([term for term, _ in items])
+        original_columns = np.array([col for _, col in items], dtype=np.int32)
+        columns = np.where(keep[original_columns], original_columns, -1).astype(np.int32)
+
+        idf = vectorizer.idf_[original_columns] if vectorizer.use_idf else np.ones(len(items))
+        params = {**vectorizer.get_params(), "vocabulary": None}
+        return cls(params, terms, columns, np.asarray(idf, dtype=np.float64), n_features,
+                   built_for=built_for, drop_pruned=not keep_pruned_for_norm)
+
+    def _build_analyzer(self):
+        # A fresh unfitted vectorizer with the same settings gives the exact
+        # preprocessing / tokenization / n-gram logic without its vocabulary
+        self._analyzer = TfidfVectorizer(**self.params).build_analyzer()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_analyzer", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_analyzer()
+
+    def _lookup(self, tokens):
+        """Row in `terms` of each token, and whether the token is a term at all."""
+        encoded = [t.encode("utf-8") for t in tokens]
+        if not encoded:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+        keys = np.array(encoded, dtype=self.terms.dtype)
+        # Tokens longer than the widest term get truncated by the dtype and
+        # could falsely match a prefix, so mask them out explicitly
+        too_long = np.fromiter(map(len, encoded), np.int64, len(encoded)) > self.terms.dtype.itemsize
+        pos = np.searchsorted(self.terms, keys)
+        pos[pos == len(self.terms)] = 0
+        return pos, (self.terms[pos] == keys) & ~too_long
+
+    def transform(self, raw_documents):
+        params = self.params
+        tokens, lengths = [], []
+        for doc in raw_documents:
+            doc_tokens = self._analyzer(doc)
+            tokens.extend(doc_tokens)
+            lengths.append(len(doc_tokens))
+
+        # One lookup for the whole batch; the COO -> CSR conversion sums
+        # repeated (document, term) pairs into counts
+        term_ids, found = self._lookup(tokens)
+        rows = np.repeat(np.arange(len(lengths)), lengths)[found]
+        counts = sp.csr_matrix(
+            (np.ones(len(rows)), (rows, term_ids[found])), shape=(len(lengths), len(self.terms))
+        )
+        counts.sum_duplicates()
+
+        values = np.ones(counts.nnz) if params["binary"] else counts.data
+        if params["sublinear_tf"]:
+            values = np.log(values) + 1
+        counts.data = values * self.idf[counts.indices]
+        if params["norm"]:
+            # Over every looked-up term, pruned ones included
+            counts = normalize(counts, norm=params["norm"], copy=False)
+
+        # Map terms to output columns, dropping the norm-only ones
+        coo = counts.tocoo()
+        cols = self.columns[coo.col]
+        emit = cols >= 0
+        matrix = sp.csr_matrix(
+            (coo.data[emit], (coo.row[emit], cols[emit])),
+            shape=(len(lengths), self.n_features),
+            dtype=params.get("dtype", np.float64),
+        )
+        matrix.sort_indices()
+        return matrix
+
+
+def used_features(model, n_features) -> np.ndarray:
+    """
+    Boolean mask of input features a fitted model can be influenced by.
+    Anything we can't inspect counts as using every feature.
+    """
+    everything = np.ones(n_features, dtype=bool)
+    try:
+        if hasattr(model, "layers"):  # Keras: rows of the first Dense kernel
+            kernel = next(l for l in model.layers if l.get_weights()).get_weights()[0]
+            return np.abs(kernel).sum(axis=1) > 0
+        if hasattr(model, "feature_log_prob_"):  # MultinomialNB: constant across classes = no effect
+            return np.ptp(model.feature_log_prob_, axis=0) > 0
+        if getattr(model, "kernel", "linear") == "linear" and hasattr(model, "coef_"):
+            coef = model.coef_
+            coef = coef.toarray() if sp.issparse(coef) else np.asarray(coef)
+            return np.abs(coef).sum(axis=0) > 0
+        if hasattr(model, "feature_importances_"):  # RF / AdaBoost / XGBoost
+            return np.asarray(model.feature_importances_) > 0
+    except Exception as e:
+        print(f"[compact_tfidf] can't inspect {type(model).__name__}: {e}")
+    return everything
+
+
+def build_compact(model_names, keep_pruned_for_norm=True):
+    import joblib
+    from app.services.loader import FP32_MODEL_LOADERS
+
+    vectorizer = joblib.load(DATA_DIR / TFIDF_SOURCE)
+    n_features = len(vectorizer.vocabulary_)
+    keep = np.zeros(n_features, dtype=bool)
+    for name in model_names:
+        used = used_features(FP32_MODEL_LOADERS[name](), n_features)
+        print(f"[compact_tfidf] {name}: {int(used.sum())}/{n_features} features used")
+        if used.all():
+            print(f"[compact_tfidf] {name} uses every feature (e.g. KNN distances); "
+                  f"leave it out of --models to allow pruning (it then keeps the original vectorizer)")
+        keep |= used
+
+    compact = CompactTfidfVectorizer.from_vectorizer(vectorizer, keep, keep_pruned_for_norm, built_for=model_names)
+    joblib.dump(compact, DATA_DIR / TFIDF_COMPACT, compress=0)
+
+    before = len(pickle.dumps(vectorizer, protocol=pickle.HIGHEST_PROTOCOL))
+    after = len(pickle.dumps(compact, protocol=pickle.HIGHEST_PROTOCOL))
+    print(f"[compact_tfidf] kept {int(keep.sum())}/{n_features} features, "
+          f"pickle {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    return vectorizer, compact
+
+
+def check_compact(vectorizer, compact, abstracts):
+    original = vectorizer.transform(abstracts)
+    candidate = compact.transform(abstracts)
+    diff = abs(original - candidate).max() if original.nnz or candidate.nnz else 0.0
+    print(f"[compact_tfidf] max abs difference over {len(abstracts)} docs: {diff:.2e}")
+    return diff
+
+
+if __name__ == "__main__":
+    from app.services.predictor import MODEL_FEATURES
+
+    tfidf_models = [name for name, feature in MODEL_FEATURES.items() if feature in ("tfidf", "tfidf_dense")]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=tfidf_models,
+                        help="classifiers whose weights decide which features to keep")
+    parser.add_argument("--drop-pruned", action="store_true",
+                        help="remove pruned terms entirely (rows are renormalized over kept terms)")
+    parser.add_argument("--check", default=None, help="arXiv JSON-lines sample to compare outputs on")
+    parser.add_argument("--check-limit", type=int, default=500)
+    args = parser.parse_args()
+
+    vectorizer, compact = build_compact(args.models, keep_pruned_for_norm=not args.drop_pruned)
+    if args.check:
+        from app.services.arxiv import clean_abstract, iter_arxiv_records
+        abstracts = [clean_abstract(r["abstract"]) for _, r in iter_arxiv_records(args.check, limit=args.check_limit)]
+        check_compact(vectorizer, compact, abstracts)
@@ -0,0 +1,205 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial
+
+from app.config import (
+    MODEL_POOL_WORKERS,
+    MODEL_POOL_QUEUE,
+    PDF_POOL_WORKERS,
+    PDF_POOL_QUEUE,
+    PDF_TIMEOUT,
+    PDF_MEMORY_LIMIT_MB,
+    LLM_POOL_WORKERS,
+    LLM_POOL_QUEUE,
+)
+
+
+class PoolSaturated(Exception):
+    """Raised when a pool already has max_workers running and max_queue waiting."""
+
+
+class TaskTimeout(Exception):
+    """Raised when a process-pool task exceeds its time budget."""
+
+
+class WorkerCrashed(Exception):
+    """Raised when a process-pool worker died (e.g. hit its memory cap)."""
+
+
+class BoundedPool:
+    """
+    Thread pool with a hard cap on admitted work. At most `max_workers` calls
+    run at once and at most `max_queue` more wait; anything beyond that is
+    rejected immediately instead of piling up behind a slow request.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._in_flight = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+        self.executor = self._make_executor()
+
+    def _make_executor(self):
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-pool")
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise PoolSaturated(f"{self.name} pool is busy, try again shortly")
+            self._in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    @contextmanager
+    def admit(self):
+        """
+        Count work that runs elsewhere (e.g. a micro-batcher's executor)
+        against this pool's limit; raises PoolSaturated when it's full.
+        """
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def run(self, fn, *args, **kwargs):
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+            }
+
+
+def _limit_memory(limit_mb: int):
+    # Process-pool initializer: cap the worker's address space so a hostile
+    # or huge document fails with MemoryError instead of starving the box
+    if limit_mb <= 0:
+        return
+    import resource
+    limit = limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+class ProcessBoundedPool(BoundedPool):
+    """
+    BoundedPool backed by worker processes, for CPU-bound pure-Python work
+    that would otherwise hold the GIL. Only `max_workers` tasks are handed
+    to the processes at a time; the rest wait on a semaphore, so queueing
+    time doesn't count against a task's `timeout` seconds, which start when
+    it does. Workers run under a memory cap. A task that overruns or kills its worker
+    makes the pool restart its processes. Any other task in flight on the
+    old processes then fails with WorkerCrashed.
+
+    The executor is created on first use, once per process: its call and
+    result pipes must not be inherited by workers forked from a pre-fork
+    parent, or they'd all share (and corrupt) the same queues. The slot
+    semaphore is likewise created per event loop.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout: float, memory_limit_mb: int):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._recycled = 0
+        self._pid = None
+        self._slots = None
+        self._slots_loop = None
+        super().__init__(name, max_workers, max_queue)
+
+    def _make_executor(self):
+        return None  # see _current_executor
+
+    def _current_executor(self):
+        with self._lock:
+            if self.executor is None or self._pid != os.getpid():
+                self.executor = self._spawn_executor()
+                self._pid = os.getpid()
+            return self.executor
+
+    def _current_slots(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._slots_loop is not loop:
+                self._slots = asyncio.Semaphore(self.max_workers)
+                self._slots_loop = loop
+            return self._slots
+
+    def _spawn_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            # spawn: never inherit the server's TF / model state through fork
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_limit_memory,
+            initargs=(self.memory_limit_mb,),
+        )
+
+    def _recycle(self, executor):
+        with self._lock:
+            if self.executor is not executor:
+                return  # another task already replaced it
+            self.executor = None
+            self._recycled += 1
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn, *args, **kwargs):
+        self._acquire()
+        try:
+            async with self._current_slots():
+                executor = self._current_executor()
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+                try:
+                    return await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    self._recycle(executor)
+                    raise TaskTimeout(f"{self.name} task exceeded {self.timeout}s")
+                except BrokenProcessPool:
+                    self._recycle(executor)
+                    raise WorkerCrashed(f"{self.name} worker crashed (memory cap is {self.memory_limit_mb} MB)")
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["recycled"] = self._recycled
+        return stats
+
+
+# One pool per workload class so e.g. a burst of slow Gemini calls can't
+# occupy the threads that local model inference needs
+pools = {
+    "model": BoundedPool("model", MODEL_POOL_WORKERS, MODEL_POOL_QUEUE),
+    "pdf": ProcessBoundedPool("pdf", PDF_POOL_WORKERS, PDF_POOL_QUEUE, PDF_TIMEOUT, PDF_MEMORY_LIMIT_MB),
+    "llm": BoundedPool("llm", LLM_POOL_WORKERS, LLM_POOL_QUEUE),
+}
+
+
+async def run_in_pool(kind: str, fn, *args, **kwargs):
+    """Run a blocking call in the pool for its workload class ("model", "pdf", "llm")."""
+    return await pools[kind].run(fn, *args, **kwargs)
+
+
+def pool_stats() -> dict:
+    return {name: pool.stats() for name, pool in pools.items()}
@@ -1,56 +1,320 @@
-from keybert import KeyBERT
-from sentence_transformers import SentenceTransformer
+from sklearn.feature_extraction.text import CountVectorizer
+import numpy as np
 import re
-from google import genai
-from google.genai import types
-from typing import List
+from typing import List, Optional
 import requests
-from app.config import GEMINI_API_KEY
+from app.config import GEMINI_API_KEY, KEYBERT_BACKBONE, KEYBERT_CACHE_DIR, KEYBERT_CACHE_SIZE, KEYBERT_ENCODE_BATCH, KEYWORD_WARMUP
+from app.services.cache import EmbeddingCache
+from app.services.lazy import LazyResource
+from app.services.metrics import instrument_service, record_service_error
 
+# The sentence-transformer (torch + ~400 MB of weights) and the Gemini client
+# are built on first use, or by warm_up() at startup, never at import.
 
-client = genai.Client()
 
+# Embedding backbones KeyBERT can run on, picked with KEYBERT_BACKBONE (a
+# name not listed here is used as a Hugging Face model id). The MiniLM and
+# ONNX entries are several times faster on CPU; compare keyword quality with
+# `python -m benchmarks.keybert_backbones` before switching.
+KEYBERT_BACKBONES = {
+    "mpnet": {"model": "sentence-transformers/all-mpnet-base-v2"},
+    "mpnet-onnx": {"model": "sentence-transformers/all-mpnet-base-v2", "backend": "onnx"},
+    "minilm": {"model": "sentence-transformers/all-MiniLM-L6-v2"},
+    "minilm-l12": {"model": "sentence-transformers/all-MiniLM-L12-v2"},
+    "minilm-onnx": {"model": "sentence-transformers/all-MiniLM-L6-v2", "backend": "onnx"},
+    "minilm-onnx-int8": {
+        "model": "sentence-transformers/all-MiniLM-L6-v2",
+        "backend": "onnx",
+        "model_kwargs": {"file_name": "onnx/model_quint8_avx2.onnx"},
+    },
+    "specter": {"model": "allenai/specter"},
+    "scibert": {"model": "allenai/scibert_scivocab_uncased"},
+}
 
-# Load once at module level
-#kw_model = KeyBERT(model=SentenceTransformer("allenai/specter"))
-kw_model = KeyBERT(model=SentenceTransformer("sentence-transformers/all-mpnet-base-v2"))
-#kw_model = KeyBERT(model=SentenceTransformer("allenai/scibert_scivocab_uncased"))
+
+class KeyBERTBackbone:
+    """A sentence-transformer plus its own phrase-embedding cache."""
+
+    def __init__(self, name: str, cache_dir=None):
+        self.name = name
+        self.spec = KEYBERT_BACKBONES.get(name, {"model": name})
+        # Deferred: importing sentence_transformers pulls in torch
+        from sentence_transformers import SentenceTransformer
+
+        kwargs = {}
+        if "backend" in self.spec:  # sentence-transformers >= 3.2
+            kwargs["backend"] = self.spec["backend"]
+        if "model_kwargs" in self.spec:
+            kwargs["model_kwargs"] = self.spec["model_kwargs"]
+        self.embedder = SentenceTransformer(self.spec["model"], **kwargs)
+
+        # Candidate phrases recur across abstracts ("neural network", "deep
+        # learning"), so their embeddings are cached on disk instead of
+        # re-encoded on every call. Vectors from different backbones aren't
+        # comparable, so each one gets its own file.
+        self.phrase_cache = EmbeddingCache(
+            (cache_dir or KEYBERT_CACHE_DIR) / f"{self.cache_key}.f16",
+            dim=self.embedder.get_sentence_embedding_dimension(),
+            maxsize=KEYBERT_CACHE_SIZE,
+        )
+
+    @property
+    def cache_key(self) -> str:
+        file_name = self.spec.get("model_kwargs", {}).get("file_name", "")
+        key = "-".join(filter(None, [self.spec["model"], self.spec.get("backend", "torch"), file_name]))
+        return re.sub(r"[^A-Za-z0-9_-]+", "_", key)
+
+    def encode(self, texts: List[str]):
+        return self.embedder.encode(texts, batch_size=KEYBERT_ENCODE_BATCH, convert_to_numpy=True)
+
+    def embed_phrases(self, phrases: List[str], with_count: bool = False):
+        """Embeddings for `phrases`, encoding only the cache misses, in one batch."""
+        vectors, missing = self.phrase_cache.get_many(phrases)
+        if missing:
+            new_phrases = [phrases[i] for i in missing]
+            encoded = self.encode(new_phrases)
+            vectors[missing] = encoded
+            self.phrase_cache.set_many(new_phrases, encoded)
+        return (vectors, len(missing)) if with_count else vectors
+
+
+def _genai_client():
+    from google import genai
+    return genai.Client()
+
+
+# Loaded once, on first use
+backbone = LazyResource("keybert", lambda: KeyBERTBackbone(KEYBERT_BACKBONE))
+gemini_client = LazyResource("gemini", _genai_client)
+
+
+class _PhraseCacheStats:
+    """stats() of the configured backbone's phrase cache, without loading it."""
+
+    def stats(self) -> dict:
+        model = backbone.peek()
+        if model is None:
+            return {"size": 0, "hits": 0, "misses": 0, "evictions": 0}
+        return model.phrase_cache.stats()
+
+
+phrase_cache = _PhraseCacheStats()
+
+KEYWORD_COMPONENTS = {"keybert": backbone, "gemini": gemini_client}
+
+
+def warm_up(names=None) -> list:
+    """
+    Build the given keyword components ("keybert", "gemini") ahead of
+    traffic. Defaults to the KEYWORD_WARMUP env setting. Failures are
+    logged and left for status(); the component retries on first use.
+    """
+    names = KEYWORD_WARMUP if names is None else names
+    warmed = []
+    for name in names:
+        if name not in KEYWORD_COMPONENTS:
+            print(f"[keywords] unknown component '{name}', skipping")
+            continue
+        try:
+            KEYWORD_COMPONENTS[name].get()
+            warmed.append(name)
+        except Exception as e:
+            print(f"[keywords] warm-up of {name} failed: {e}")
+    return warmed
+
+
+def status() -> dict:
+    """Per-component load state, for the readiness endpoint."""
+    report = {}
+    for name, component in KEYWORD_COMPONENTS.items():
+        report[name] = {"status": component.status(), "warmup": name in KEYWORD_WARMUP}
+        if component.error:
+            report[name]["error"] = component.error
+    report["keybert"]["backbone"] = KEYBERT_BACKBONE
+    return report
+
+
+# Documents stepped through MMR together: at most MMR_CHUNK of them, and at
+# most MMR_MAX_CELLS entries in the chunk's (docs x candidates^2) pair matrix
+MMR_CHUNK = 16
+MMR_MAX_CELLS = 4_000_000
 
 # Bad keyword filters
+BLACKLIST_PARTS = ("doi", "http", "@", "copyright", "cn", "com", "edu", "org", "gmail")
+BLACKLIST_WORDS = ("introduction", "conclusion", "abstract", "figure")
+
+
 def is_clean_keyword(kw: str) -> bool:
     if any(char.isdigit() for char in kw):
         return False
     if len(kw.split()) < 2:
         return False
-    if re.search(r"(doi|http|@|copyright|cn|com|edu|org|gmail)", kw, re.IGNORECASE):
+    if re.search("|".join(BLACKLIST_PARTS), kw, re.IGNORECASE):
         return False
-    if kw.lower() in {"introduction", "conclusion", "abstract", "figure"}:
+    if kw.lower() in BLACKLIST_WORDS:
         return False
     return True
 
-def extract_keywords_keybert(text: str, top_n: int = 10, title: str = None):
+
+def clean_keyword_mask(phrases) -> np.ndarray:
+    """is_clean_keyword over a whole candidate array, as boolean masks."""
+    phrases = np.asarray(phrases, dtype=str)
+    lower = np.char.lower(phrases)
+    # str.isdigit, not an ASCII digit search: "²nd" and "١٢٣" count as digits too
+    keep = np.fromiter((not any(c.isdigit() for c in p) for p in phrases), bool, len(phrases))
+    keep &= np.char.count(np.char.strip(lower), " ") >= 1    # at least two words
+    keep &= ~np.isin(lower, BLACKLIST_WORDS)
+    for part in BLACKLIST_PARTS:
+        keep &= np.char.find(lower, part) < 0
+    return keep
+
+
+def _normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return x / norms
+
+
+def mmr(doc_sim, pair_sim, available, top_n: int, diversity: float):
     """
-    Extract top N clean keywords from academic text using KeyBERT.
-    Includes MMR-based diversity and optional title boosting.
+    Maximal Marginal Relevance on precomputed similarities, for a stack of
+    documents at once. Same selection rule as KeyBERT's mmr(): start from
+    the candidate closest to the document, then repeatedly take the one
+    maximizing (1 - diversity) * sim(doc) - diversity * max sim(selected).
+
+    doc_sim: (docs, candidates) candidate-to-document similarity
+    pair_sim: (docs, candidates, candidates) candidate-to-candidate similarity
+    available: (docs, candidates) mask of real (non-padding) candidates
+    Returns (docs, steps) picked columns in selection order, -1 once a
+    document runs out of candidates.
+    """
+    n, m = doc_sim.shape
+    available = available.copy()
+    max_sim = np.full((n, m), -np.inf, dtype=np.float32)
+    rows = np.arange(n)
+    picks = np.full((n, min(top_n, m)), -1, dtype=np.int64)
+    for step in range(picks.shape[1]):
+        score = doc_sim if step == 0 else (1 - diversity) * doc_sim - diversity * max_sim
+        pick = np.where(available, score, -np.inf).argmax(axis=1)
+        picks[:, step] = np.where(available[rows, pick], pick, -1)
+        available[rows, pick] = False
+        max_sim = np.maximum(max_sim, pair_sim[rows, pick])
+    return picks
+
+
+def _mmr_chunks(counts):
+    """
+    Split document positions into MMR chunks. Documents are taken in order of
+    candidate count, so each chunk pads to a similar size, and a chunk stops
+    growing once n * m^2 would pass MMR_MAX_CELLS (a single document with
+    more candidates than that still gets a chunk of its own).
+    """
+    order = np.argsort(counts, kind="stable")[::-1]
+    chunk = []
+    for position in order:
+        m = counts[chunk[0]] if chunk else counts[position]
+        if chunk and (len(chunk) == MMR_CHUNK or (len(chunk) + 1) * m * m > MMR_MAX_CELLS):
+            yield chunk
+            chunk = []
+        chunk.append(int(position))
+    if chunk:
+        yield chunk
+
+
+def mmr_batch(doc_embeddings, word_embeddings, doc_candidates, top_n: int, diversity: float):
+    """
+    mmr() over a batch. `doc_candidates[i]` holds the rows of
+    `word_embeddings` that occur in document i. Documents with similar
+    candidate counts are padded to the same size and stepped through together
+    (see _mmr_chunks). Returns (candidate rows, similarity to the document)
+    per document, in input order and selection order.
     """
+    docs = _normalize(doc_embeddings)
+    words = _normalize(word_embeddings)
+    results = [None] * len(docs)
+    for chunk in _mmr_chunks(np.array([len(c) for c in doc_candidates])):
+        n, m = len(chunk), max(len(doc_candidates[i]) for i in chunk)
+        index = np.zeros((n, m), dtype=np.int64)
+        available = np.zeros((n, m), dtype=bool)
+        for row, i in enumerate(chunk):
+            index[row, :len(doc_candidates[i])] = doc_candidates[i]
+            available[row, :len(doc_candidates[i])] = True
+
+        vectors = words[index]                                      # n x m x dim
+        doc_sim = np.einsum("nmd,nd->nm", vectors, docs[chunk])
+        pair_sim = vectors @ vectors.transpose(0, 2, 1)              # n x m x m
+        picks = mmr(doc_sim, pair_sim, available, top_n, diversity)
+
+        for row, i in enumerate(chunk):
+            chosen = picks[row][picks[row] >= 0]
+            results[i] = (index[row, chosen], doc_sim[row, chosen])
+    return results
 
-    if title:
-        # Boost title terms by adding it twice
-        text = f"{title}. {title}. {text}"
 
-    raw_keywords = kw_model.extract_keywords(
-        text,
-        keyphrase_ngram_range=(2, 4),     # force multi-word phrases
-        stop_words='english',
-        use_mmr=True,
+def _keybert_batch(texts: List[str], top_n: int, titles: Optional[List[Optional[str]]],
+                   model: Optional[KeyBERTBackbone] = None):
+    """Returns (keywords per document, stats of the call)."""
+    model = model or backbone.get()
+    titles = titles or [None] * len(texts)
+    # Boost title terms by adding it twice
+    docs = [f"{title}. {title}. {text}" if title else text for text, title in zip(texts, titles)]
+    stats = {"documents": len(docs), "candidates": 0, "filtered": 0, "encoded": 0}
+
+    # Same candidates KeyBERT would build (2-4 grams, english stop words),
+    # from one vocabulary and one sparse pass over the whole batch
+    vectorizer = CountVectorizer(ngram_range=(2, 4), stop_words="english")
+    try:
+        counts = vectorizer.fit_transform(docs)
+    except ValueError:  # empty vocabulary (only stop words / too short)
+        return [[] for _ in docs], stats
+    candidates = vectorizer.get_feature_names_out()
+
+    # Drop bad keywords before they cost an embedding or an MMR step
+    keep = np.flatnonzero(clean_keyword_mask(candidates))
+    stats["filtered"] = len(candidates) - len(keep)
+    candidates = candidates[keep]
+    counts = counts[:, keep].tocsr()
+    doc_candidates = [counts.indices[counts.indptr[i]:counts.indptr[i + 1]] for i in range(len(docs))]
+    stats["candidates"] = len(candidates)
+    if not len(candidates):
+        return [[] for _ in docs], stats
+
+    doc_embeddings = model.encode(docs)
+    word_embeddings, stats["encoded"] = model.embed_phrases(candidates.tolist(), with_count=True)
+
+    selected = mmr_batch(
+        doc_embeddings,
+        word_embeddings,
+        doc_candidates,
+        top_n=top_n,
         diversity=0.6,                    # 0.5–0.7 is a good range
-        top_n=max(30, top_n * 3)
     )
+    return [candidates[rows].tolist() for rows, _ in selected], stats
 
-    
 
-    filtered = [kw for kw, _ in raw_keywords if is_clean_keyword(kw)]
-    return filtered[:top_n]
+@instrument_service("keywords", "keybert")
+def extract_keywords_keybert(text: str, top_n: int = 10, title: str = None):
+    """
+    Extract top N clean keywords from academic text using KeyBERT.
+    Includes MMR-based diversity and optional title boosting.
+    """
+    keywords, _ = _keybert_batch([text], top_n, [title])
+    return keywords[0]
+
+
+@instrument_service("keywords", "keybert_batch")
+def extract_keywords_keybert_batch(texts: List[str], top_n: int = 10, titles: Optional[List[Optional[str]]] = None,
+                                   with_stats: bool = False, model: Optional[KeyBERTBackbone] = None):
+    """
+    extract_keywords_keybert for many documents at once: one candidate
+    vocabulary, one encode call for the documents and one for the uncached
+    candidate phrases, MMR stepped across the batch in NumPy. With
+    `with_stats`, also returns {"documents", "candidates", "filtered", "encoded"}.
+    `model` overrides the configured backbone (used by the benchmarks).
+    """
+    keywords, stats = _keybert_batch(texts, top_n, titles, model)
+    return (keywords, stats) if with_stats else keywords
  
 
 # def extract_keywords_keybert(text: str, top_n: int = 10, title: str = None):
@@ -77,6 +341,7 @@ def extract_keywords_keybert(text: str, top_n: int = 10, title: str = None):
 
 #gemini keyword extractions
 
+@instrument_service("keywords", "gemini")
 def extract_keywords_gemini(text: str, top_n: int = 10) -> List[str]:
     prompt = f"""
 Extract the top {top_n} most relevant keywords or keyphrases from the following academic abstract.
@@ -86,7 +351,9 @@ Abstract:
 {text}
 """
     try:
-        response = client.models.generate_content(
+        from google.genai import types
+
+        response = gemini_client.get().models.generate_content(
             model="models/gemini-1.5-flash",  # Use 2.5 only if you’re enrolled in trusted tester
             contents=[{"role": "user", "parts": [{"text": prompt}]}],
             config=types.GenerateContentConfig(
@@ -100,4 +367,5 @@ Abstract:
 
     except Exception as e:
         print("[Gemini Keyword Error]", e)
+        record_service_error("keywords", "gemini")
         return []
\ No newline at end of file
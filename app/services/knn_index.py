@@ -0,0 +1,148 @@
+"""
+Approximate nearest-neighbour replacement for the brute-force KNN model.
+
+    python -m app.services.knn_index --lists 256 --probe 8
+
+builds an IVF index from DATA_DIR/knn_classifier_light.pkl. It writes
+DATA_DIR/knn_ivf_light.pkl, which the loader serves when KNN_BACKEND=ivf.
+
+Training rows are L2-normalized TF-IDF vectors. A sparse random projection
+to a few hundred dense dimensions is clustered with MiniBatchKMeans into
+`n_lists` inverted lists. A query probes the `n_probe` closest lists and
+ranks only those candidates exactly, on the original sparse vectors. On
+unit vectors, euclidean order equals cosine order, so results match the
+original model whenever the true neighbours fall in the probed lists.
+"""
+import argparse
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import normalize
+from sklearn.random_projection import SparseRandomProjection
+
+from app.config import DATA_DIR
+
+KNN_SOURCE = "knn_classifier_light.pkl"
+KNN_INDEX = "knn_ivf_light.pkl"
+
+
+class IVFKNNClassifier:
+    """KNN classifier over an inverted-file index; same predict / predict_proba API as sklearn."""
+
+    def __init__(self, n_neighbors=5, weights="uniform", n_lists=256, n_probe=8,
+                 projection_dim=256, random_state=0):
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.projection_dim = projection_dim
+        self.random_state = random_state
+
+    @classmethod
+    def from_knn(cls, knn, **kwargs):
+        """Index the training set stored inside a fitted KNeighborsClassifier."""
+        if not callable(knn.weights) and knn.weights not in ("uniform", "distance"):
+            raise ValueError(f"Unsupported KNN weights: {knn.weights}")
+        # The index ranks by cosine on normalized rows, which only reproduces
+        # euclidean (minkowski p=2) or cosine neighbours
+        metric = getattr(knn, "effective_metric_", knn.metric)
+        p = getattr(knn, "effective_metric_params_", {}).get("p", knn.p)
+        if not (metric in ("euclidean", "l2", "cosine") or (metric == "minkowski" and p == 2)):
+            raise ValueError(f"Unsupported KNN metric: {metric} (p={p})")
+        index = cls(n_neighbors=knn.n_neighbors, weights=knn.weights, **kwargs)
+        return index.fit(knn._fit_X, knn._y, knn.classes_)
+
+    def fit(self, X, y, classes):
+        self.classes_ = np.asarray(classes)
+        self._X = normalize(X).tocsr().astype(np.float32)
+        self._y = np.asarray(y)
+
+        self._projection = SparseRandomProjection(
+            n_components=self.projection_dim, dense_output=True, random_state=self.random_state
+        )
+        Z = normalize(self._projection.fit_transform(self._X))
+
+        n_lists = min(self.n_lists, self._X.shape[0])
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.random_state, n_init=3)
+        assignments = kmeans.fit_predict(Z)
+        self._centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+
+        # Inverted lists as one sorted id array plus offsets
+        self._list_ids = np.argsort(assignments, kind="stable").astype(np.int32)
+        counts = np.bincount(assignments, minlength=n_lists)
+        self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+        return self
+
+    def _candidates(self, probe_lists):
+        return np.concatenate([
+            self._list_ids[self._list_offsets[l]:self._list_offsets[l + 1]]
+            for l in probe_lists
+        ])
+
+    def kneighbors(self, X):
+        """Returns (distances, indices) of the n_neighbors nearest training rows."""
+        Xq = normalize(X).tocsr().astype(np.float32)
+        Zq = normalize(self._projection.transform(Xq))
+        n_probe = min(self.n_probe, len(self._centroids))
+        probes = np.argsort(-(Zq @ self._centroids.T), axis=1)[:, :n_probe]
+
+        k = self.n_neighbors
+        distances = np.full((Xq.shape[0], k), np.inf, dtype=np.float32)
+        indices = np.full((Xq.shape[0], k), -1, dtype=np.int64)
+        for row, probe_lists in enumerate(probes):
+            candidates = self._candidates(probe_lists)
+            if len(candidates) < k:  # tiny lists: fall back to a full scan
+                candidates = np.arange(self._X.shape[0])
+            sims = (self._X[candidates] @ Xq[row].T).toarray().ravel()
+            top = np.argpartition(-sims, k - 1)[:k] if len(sims) > k else np.arange(len(sims))
+            top = top[np.argsort(-sims[top])]
+            indices[row, :len(top)] = candidates[top]
+            # Euclidean distance between unit vectors
+            distances[row, :len(top)] = np.sqrt(np.maximum(2 - 2 * sims[top], 0))
+        return distances, indices
+
+    def predict_proba(self, X):
+        distances, indices = self.kneighbors(X)
+        if self.weights == "distance":
+            with np.errstate(divide="ignore"):
+                weights = 1.0 / distances
+            # Exact matches dominate, as in sklearn
+            exact = np.isinf(weights)
+            weights = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), weights)
+        elif callable(self.weights):
+            weights = self.weights(distances)
+        else:
+            weights = np.ones_like(distances)
+        weights = np.where(indices >= 0, weights, 0)
+
+        proba = np.zeros((len(indices), len(self.classes_)))
+        labels = self._y[np.maximum(indices, 0)]
+        for column in range(indices.shape[1]):
+            np.add.at(proba, (np.arange(len(indices)), labels[:, column]), weights[:, column])
+        totals = proba.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1
+        return proba / totals
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def build_knn_index(n_lists=256, n_probe=8, projection_dim=256):
+    import joblib
+
+    knn = joblib.load(DATA_DIR / KNN_SOURCE)
+    index = IVFKNNClassifier.from_knn(
+        knn, n_lists=n_lists, n_probe=n_probe, projection_dim=projection_dim
+    )
+    joblib.dump(index, DATA_DIR / KNN_INDEX, compress=0)
+    print(f"[knn_index] {index._X.shape[0]} rows in {len(index._centroids)} lists -> {DATA_DIR / KNN_INDEX}")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lists", type=int, default=256)
+    parser.add_argument("--probe", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+    build_knn_index(args.lists, args.probe, args.dim)
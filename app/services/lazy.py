@@ -0,0 +1,48 @@
+import threading
+
+
+class LazyResource:
+    """
+    A value built on first use. The factory runs once, under a lock; after
+    that get() is a plain attribute read (double-checked locking). A failed
+    build is kept in `error` for status() and retried on the next get().
+    """
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self._factory = factory
+        self._value = None
+        self._ready = False
+        self._loading = False
+        self.error = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                self._loading = True
+                try:
+                    self._value = self._factory()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                finally:
+                    self._loading = False
+                self.error = None
+                self._ready = True
+        return self._value
+
+    def peek(self):
+        """The value if it has been built, else None. Never triggers a build."""
+        return self._value if self._ready else None
+
+    def status(self) -> str:
+        if self._ready:
+            return "ready"
+        if self._loading:
+            return "loading"
+        if self.error:
+            return "error"
+        return "not_loaded"
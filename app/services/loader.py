@@ -1,35 +1,365 @@
+import hashlib
+import os
+import sys
+import threading
+from collections.abc import Mapping
+from functools import lru_cache
+
 import joblib
-from transformers import TFBertForSequenceClassification, BertTokenizerFast
-from pathlib import Path
-import pickle
-from keras.models import load_model
 
-from app.config import DATA_DIR
+from app.config import DATA_DIR, MODEL_WARMUP, MODEL_VERSION, BERT_BACKEND, QUANTIZED_MODELS, MODEL_MMAP, KNN_BACKEND, TFIDF_COMPACT
 print (DATA_DIR)
-def load_all_models():
-    models = {
-        "SVM": joblib.load(DATA_DIR/"svm_model_light.pkl"),
-        "MNB":joblib.load(DATA_DIR/"mnb_model_light.pkl"),
-        "Random Forest": joblib.load(DATA_DIR / "rf_model_light.pkl"),
-        "AdaBoost": joblib.load(DATA_DIR / "ada_model_light.pkl"),
-        "KNN": joblib.load(DATA_DIR / "knn_classifier_light.pkl"),
-        "Feedforward NN": load_model(DATA_DIR / "feedforward_model_light.h5"),
-        "XG_BOOST": joblib.load(DATA_DIR / "xgb_model_light.pkl"),
-        "BiLSTM": load_model(DATA_DIR / "bilstm_model_light.h5"),
-        "BERT": TFBertForSequenceClassification.from_pretrained(str(DATA_DIR / "bert_model_light"))
-    }
-    
 
-    tokenizers = {
-        "TFIDF": joblib.load(DATA_DIR / "tfidf_vectorizer_light_v2.pkl"),
-        "NN": joblib.load(DATA_DIR / "nn_tokenizer.pkl"),
-        "BERT": BertTokenizerFast.from_pretrained(str(DATA_DIR / "bert_tokenizer_light"))
+TFIDF_ARTIFACT = "tfidf_vectorizer_light_v2.pkl"
+TFIDF_COMPACT_ARTIFACT = "tfidf_vectorizer_light_v2.compact.pkl"
+
+MMAP_DIR = DATA_DIR / "mmap"
+
+# joblib artifacts whose numpy arrays are worth sharing through the page cache
+MMAP_ARTIFACTS = [
+    "svm_model_light.pkl",
+    "mnb_model_light.pkl",
+    "rf_model_light.pkl",
+    "ada_model_light.pkl",
+    "knn_classifier_light.pkl",
+    "knn_ivf_light.pkl",
+    "xgb_model_light.pkl",
+    "tfidf_vectorizer_light_v2.pkl",
+    "tfidf_vectorizer_light_v2.compact.pkl",
+]
+
+
+def _load_joblib(filename):
+    """
+    With MODEL_MMAP on, load the uncompressed copy under DATA_DIR/mmap with
+    mmap_mode='r': numpy arrays become read-only maps of the file, so every
+    worker on the box shares the same physical pages.
+    """
+    mmap_path = MMAP_DIR / filename
+    if MODEL_MMAP and mmap_path.exists():
+        if _mmap_copy_is_current(filename):
+            return joblib.load(mmap_path, mmap_mode="r")
+        print(f"[mmap] {mmap_path} is older than {DATA_DIR / filename}; loading the source "
+              f"(re-run python -m app.services.loader --export-mmap)")
+    return joblib.load(DATA_DIR / filename)
+
+
+def _source_stamp(filename) -> str:
+    stat = (DATA_DIR / filename).stat()
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def _mmap_copy_is_current(filename) -> bool:
+    # The export records the source's mtime/size next to the copy
+    stamp_path = MMAP_DIR / f"{filename}.source"
+    try:
+        return stamp_path.read_text().strip() == _source_stamp(filename)
+    except FileNotFoundError:
+        return False
+
+
+def export_mmap_artifacts(filenames=None):
+    """
+    Re-dump joblib artifacts uncompressed (compress=0) so their arrays can be
+    memory-mapped. Compressed or plain pickles can't be mapped; joblib has to
+    write each numpy array as its own raw block for mmap_mode to work.
+    """
+    MMAP_DIR.mkdir(parents=True, exist_ok=True)
+    exported = []
+    for filename in filenames or MMAP_ARTIFACTS:
+        if not (DATA_DIR / filename).exists():
+            print(f"[mmap] {filename} not found, skipping")
+            continue
+        stamp = _source_stamp(filename)
+        obj = joblib.load(DATA_DIR / filename)
+        tmp_path = MMAP_DIR / f"{filename}.tmp"
+        joblib.dump(obj, tmp_path, compress=0)
+        os.replace(tmp_path, MMAP_DIR / filename)
+        (MMAP_DIR / f"{filename}.source").write_text(stamp)
+        print(f"[mmap] exported {filename}")
+        exported.append(filename)
+    return exported
+
+
+# Heavy frameworks (keras / transformers) are imported inside the loaders so
+# importing this module stays cheap for workers that only serve auth/dashboard.
+def _load_keras(filename):
+    from keras.models import load_model
+    return load_model(DATA_DIR / filename)
+
+
+def _load_bert_model():
+    from transformers import TFBertForSequenceClassification
+    return TFBertForSequenceClassification.from_pretrained(str(DATA_DIR / "bert_model_light"))
+
+
+def _load_bert_onnx():
+    from app.services.onnx_backend import load_bert_onnx
+    return load_bert_onnx(_load_bert_model, _artifact_stamp(DATA_DIR / "bert_model_light"))
+
+
+def _load_bert_tokenizer():
+    from transformers import BertTokenizerFast
+    return BertTokenizerFast.from_pretrained(str(DATA_DIR / "bert_tokenizer_light"))
+
+
+def _load_quantized(name):
+    from app.services.quantize import load_quantized
+    return load_quantized(name)
+
+
+FP32_MODEL_LOADERS = {
+    "SVM": lambda: _load_joblib("svm_model_light.pkl"),
+    "MNB": lambda: _load_joblib("mnb_model_light.pkl"),
+    "Random Forest": lambda: _load_joblib("rf_model_light.pkl"),
+    "AdaBoost": lambda: _load_joblib("ada_model_light.pkl"),
+    "KNN": lambda: _load_joblib("knn_ivf_light.pkl" if KNN_BACKEND == "ivf" else "knn_classifier_light.pkl"),
+    "Feedforward NN": lambda: _load_keras("feedforward_model_light.h5"),
+    "XG_BOOST": lambda: _load_joblib("xgb_model_light.pkl"),
+    "BiLSTM": lambda: _load_keras("bilstm_model_light.h5"),
+    "BERT": _load_bert_onnx if BERT_BACKEND == "onnx" else _load_bert_model,
+}
+
+# Models that run on TensorFlow (Keras, or BERT unless BERT_BACKEND=onnx)
+TF_MODELS = ['Feedforward NN','BiLSTM','BERT']
+
+QUANTIZED_MODEL_LOADERS = {
+    "BERT": lambda: _load_quantized("BERT"),
+    "BiLSTM": lambda: _load_quantized("BiLSTM"),
+    "Feedforward NN": lambda: _load_quantized("Feedforward NN"),
+}
+
+
+def load_model_variant(name: str, quantized: bool = False):
+    """Load a fresh copy of one model, bypassing the registry (for benchmarks)."""
+    if quantized:
+        return QUANTIZED_MODEL_LOADERS[name]()
+    return FP32_MODEL_LOADERS[name]()
+
+
+MODEL_LOADERS = {
+    name: QUANTIZED_MODEL_LOADERS[name] if name in QUANTIZED_MODELS and name in QUANTIZED_MODEL_LOADERS else loader
+    for name, loader in FP32_MODEL_LOADERS.items()
+}
+for _name in QUANTIZED_MODELS:
+    if _name not in QUANTIZED_MODEL_LOADERS:
+        print(f"[loader] no quantized variant for '{_name}', serving fp32")
+
+TOKENIZER_LOADERS = {
+    "TFIDF": lambda: _load_joblib(TFIDF_ARTIFACT),
+    "TFIDF_COMPACT": lambda: _load_joblib(TFIDF_COMPACT_ARTIFACT),
+    "NN": lambda: _load_joblib("nn_tokenizer.pkl"),
+    "BERT": _load_bert_tokenizer,
+}
+
+# Tokenizers each model needs at inference time (used for warm-up)
+MODEL_TOKENIZERS = {
+    "SVM": ["TFIDF"],
+    "MNB": ["TFIDF"],
+    "Random Forest": ["TFIDF"],
+    "AdaBoost": ["TFIDF"],
+    "KNN": ["TFIDF"],
+    "Feedforward NN": ["TFIDF"],
+    "XG_BOOST": ["TFIDF"],
+    "BiLSTM": ["NN"],
+    "BERT": ["BERT"],
+}
+
+
+# Artifacts behind each model; used to derive a version for result caching
+MODEL_ARTIFACTS = {
+    "SVM": ["svm_model_light.pkl", TFIDF_ARTIFACT],
+    "MNB": ["mnb_model_light.pkl", TFIDF_ARTIFACT],
+    "Random Forest": ["rf_model_light.pkl", TFIDF_ARTIFACT],
+    "AdaBoost": ["ada_model_light.pkl", TFIDF_ARTIFACT],
+    "KNN": ["knn_ivf_light.pkl" if KNN_BACKEND == "ivf" else "knn_classifier_light.pkl", TFIDF_ARTIFACT],
+    "Feedforward NN": ["feedforward_model_light.h5", TFIDF_ARTIFACT],
+    "XG_BOOST": ["xgb_model_light.pkl", TFIDF_ARTIFACT],
+    "BiLSTM": ["bilstm_model_light.h5", "nn_tokenizer.pkl"],
+    "BERT": ["bert_model_light", "bert_tokenizer_light"],
+}
+
+
+def tfidf_tokenizer_key(model_name: str) -> str:
+    """
+    "TFIDF_COMPACT" when TFIDF_COMPACT is on and the compact vectorizer was
+    built for this model, else "TFIDF". Its pruned features (and, with
+    --drop-pruned, its normalization) were only checked against the
+    weights of the models it was built for; everyone else gets the original.
+    """
+    if not TFIDF_COMPACT:
+        return "TFIDF"
+    return "TFIDF_COMPACT" if model_name in getattr(tokenizers["TFIDF_COMPACT"], "built_for", ()) else "TFIDF"
+
+
+def model_tokenizers(model_name: str) -> list:
+    """MODEL_TOKENIZERS entry with the TF-IDF variant this model is served."""
+    return [tfidf_tokenizer_key(model_name) if key == "TFIDF" else key for key in MODEL_TOKENIZERS.get(model_name, [])]
+
+
+def model_artifacts(model_name: str) -> list:
+    """MODEL_ARTIFACTS entry with the TF-IDF file this model is served."""
+    artifacts = MODEL_ARTIFACTS.get(model_name, [])
+    if TFIDF_ARTIFACT in artifacts and tfidf_tokenizer_key(model_name) == "TFIDF_COMPACT":
+        return [TFIDF_COMPACT_ARTIFACT if filename == TFIDF_ARTIFACT else filename for filename in artifacts]
+    return artifacts
+
+
+def _artifact_stamp(path):
+    if not path.exists():
+        return "missing"
+    if path.is_dir():
+        files = [f for f in path.rglob("*") if f.is_file()]
+        mtime = max((f.stat().st_mtime for f in files), default=0)
+        size = sum(f.stat().st_size for f in files)
+    else:
+        mtime, size = path.stat().st_mtime, path.stat().st_size
+    return f"{int(mtime)}-{size}"
+
+
+@lru_cache(maxsize=None)
+def model_version(model_name: str) -> str:
+    """
+    Version string for a model (or "ALL"), derived from MODEL_VERSION and the
+    mtime/size of its artifacts, so swapping a file under DATA_DIR
+    invalidates cached predictions after a restart.
+    """
+    names = list(MODEL_ARTIFACTS) if model_name == "ALL" else [model_name]
+    stamps = [
+        _artifact_stamp(DATA_DIR / filename)
+        for name in names
+        for filename in model_artifacts(name) + ["label_encoder_light_v2.pkl"]
+    ]
+    if "BERT" in names:
+        stamps.append(BERT_BACKEND)
+    if any(name in QUANTIZED_MODELS for name in names):
+        from app.services.quantize import QUANTIZED_ARTIFACTS
+        stamps += [
+            f"int8:{name}:{_artifact_stamp(QUANTIZED_ARTIFACTS[name])}"
+            for name in names
+            if name in QUANTIZED_MODELS and name in QUANTIZED_ARTIFACTS
+        ]
+    return f"{MODEL_VERSION}:" + hashlib.sha1("|".join(stamps).encode()).hexdigest()[:12]
+
+
+class LazyRegistry(Mapping):
+    """
+    Dict-like registry that loads each entry on first access and caches it.
+    Iteration and membership only look at the registered names, so
+    `name in models` / `for key in models` never trigger a load.
+    """
+
+    def __init__(self, name: str, loaders: dict):
+        self.name = name
+        self._loaders = dict(loaders)
+        self._cache = {}
+        self._locks = {key: threading.Lock() for key in self._loaders}
+
+    def __getitem__(self, key):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        if key not in self._loaders:
+            raise KeyError(key)
+        # Per-key lock so two requests don't deserialize the same model twice
+        with self._locks[key]:
+            if key not in self._cache:
+                print(f"[{self.name}] loading {key}")
+                self._cache[key] = self._loaders[key]()
+        return self._cache[key]
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def is_loaded(self, key) -> bool:
+        return key in self._cache
+
+    def loaded(self) -> list:
+        return [key for key in self._loaders if key in self._cache]
+
+    def load(self, keys=None):
+        for key in (keys if keys is not None else self._loaders):
+            self[key]
+
+
+models = LazyRegistry("models", MODEL_LOADERS)
+tokenizers = LazyRegistry("tokenizers", TOKENIZER_LOADERS)
+
+_label_encoder = None
+_label_encoder_lock = threading.Lock()
+
+
+def get_label_encoder():
+    global _label_encoder
+    if _label_encoder is None:
+        with _label_encoder_lock:
+            if _label_encoder is None:
+                _label_encoder = _load_joblib("label_encoder_light_v2.pkl")
+    return _label_encoder
+
+
+def warmup_targets(names=None) -> list:
+    """
+    Model names to warm: `names` is a list or a comma separated string,
+    "ALL" means every model. Defaults to the MODEL_WARMUP env setting.
+    """
+    if names is None:
+        names = MODEL_WARMUP
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(",") if n.strip()]
+    if "ALL" in names:
+        names = list(models)
+    return names
+
+
+def warm_up(names=None):
+    """
+    Load the given models (plus the tokenizers they depend on) ahead of traffic.
+    See warmup_targets() for `names`.
+    """
+    names = warmup_targets(names)
+    if not names:
+        return []
+
+    warmed = []
+    for name in names:
+        if name not in models:
+            print(f"[warm_up] unknown model '{name}', skipping")
+            continue
+        tokenizers.load(model_tokenizers(name))
+        models[name]
+        warmed.append(name)
+    get_label_encoder()
+    return warmed
+
+
+def status() -> dict:
+    """Registry load state, for the readiness endpoint."""
+    pending = [name for name in warmup_targets() if name in models and not models.is_loaded(name)]
+    return {
+        "status": "loading" if pending else "ready",
+        "loaded": models.loaded(),
+        "pending_warmup": pending,
     }
 
-    label_encoder = joblib.load(DATA_DIR / "label_encoder_light_v2.pkl")
+
+def load_all_models():
+    """Eagerly load everything. Kept for scripts that want the old behaviour."""
+    models.load()
+    tokenizers.load([key for key in TOKENIZER_LOADERS if key != "TFIDF_COMPACT" or TFIDF_COMPACT])
+    label_encoder = get_label_encoder()
     tfidf_vectorizer = tokenizers["TFIDF"]
 
     return models, tokenizers, label_encoder,tfidf_vectorizer
 
 
-
+if __name__ == "__main__":
+    # python -m app.services.loader --export-mmap [file.pkl ...]
+    if sys.argv[1:2] == ["--export-mmap"]:
+        export_mmap_artifacts(sys.argv[2:] or None)
+    else:
+        print("usage: python -m app.services.loader --export-mmap [file.pkl ...]")
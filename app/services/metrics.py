@@ -0,0 +1,130 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily
+
+# Buckets span sub-millisecond TF-IDF models up to multi-second summarizers
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+MODEL_PHASE_SECONDS = Histogram(
+    "research_buddy_model_phase_seconds",
+    "Time spent per classifier call, split into vectorize / inference / decode "
+    "(model=\"shared\": features built once for several models)",
+    ["model", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_CALLS = Counter(
+    "research_buddy_model_calls_total",
+    "Classifier calls (one per batch)",
+    ["model"],
+)
+MODEL_DOCUMENTS = Counter(
+    "research_buddy_model_documents_total",
+    "Abstracts classified",
+    ["model"],
+)
+MODEL_ERRORS = Counter(
+    "research_buddy_model_errors_total",
+    "Classifier calls that raised",
+    ["model"],
+)
+
+SERVICE_SECONDS = Histogram(
+    "research_buddy_service_seconds",
+    "Latency of keyword extraction and summarization calls",
+    ["service", "backend"],
+    buckets=LATENCY_BUCKETS,
+)
+SERVICE_CALLS = Counter(
+    "research_buddy_service_calls_total",
+    "Keyword extraction and summarization calls",
+    ["service", "backend"],
+)
+SERVICE_ERRORS = Counter(
+    "research_buddy_service_errors_total",
+    "Keyword extraction and summarization calls that failed",
+    ["service", "backend"],
+)
+
+
+@contextmanager
+def observe_phase(model: str, phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        MODEL_PHASE_SECONDS.labels(model, phase).observe(time.perf_counter() - start)
+
+
+def record_service_error(service: str, backend: str):
+    """For services that catch their own exceptions and return a fallback."""
+    SERVICE_ERRORS.labels(service, backend).inc()
+
+
+def instrument_service(service: str, backend: str):
+    """Decorator recording call count, latency and raised errors for a service function."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            SERVICE_CALLS.labels(service, backend).inc()
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                SERVICE_ERRORS.labels(service, backend).inc()
+                raise
+            finally:
+                SERVICE_SECONDS.labels(service, backend).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class CacheCollector:
+    """
+    Exports each cache's own hit / miss / eviction counters as a Prometheus
+    counter, read at scrape time, so rate() works on them.
+    """
+
+    EVENTS = ("hits", "misses", "evictions")
+
+    def __init__(self, caches: dict):
+        self.caches = caches
+
+    def describe(self):
+        # Static description, so registering doesn't have to read the caches
+        return [CounterMetricFamily("research_buddy_cache_events", "Cache hit / miss / eviction counts",
+                                    labels=["cache", "event"])]
+
+    def collect(self):
+        family = CounterMetricFamily(
+            "research_buddy_cache_events",
+            "Cache hit / miss / eviction counts",
+            labels=["cache", "event"],
+        )
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            for event in self.EVENTS:
+                family.add_metric([name, event], stats.get(event, 0))
+        yield family
+
+
+def register_runtime_gauges(pools: dict, caches: dict):
+    """Expose executor queue depth and cache counters, read at scrape time."""
+    pool_gauge = Gauge(
+        "research_buddy_pool_in_flight",
+        "Calls running or queued in each bounded executor",
+        ["pool"],
+    )
+    pool_rejected = Gauge(
+        "research_buddy_pool_rejected",
+        "Calls rejected because the executor was saturated",
+        ["pool"],
+    )
+    for name, pool in pools.items():
+        pool_gauge.labels(name).set_function(lambda pool=pool: pool.stats()["in_flight"])
+        pool_rejected.labels(name).set_function(lambda pool=pool: pool.stats()["rejected"])
+
+    REGISTRY.register(CacheCollector(caches))
+
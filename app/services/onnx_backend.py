@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.config import DATA_DIR, ONNX_INTRA_OP_THREADS, ONNX_INTER_OP_THREADS
+
+ONNX_DIR = DATA_DIR / "onnx"
+BERT_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def export_bert_to_onnx(tf_model, output_path: Path, opset: int = 14) -> Path:
+    """
+    Export a TFBertForSequenceClassification to ONNX with dynamic batch and
+    sequence axes. Written to a temp file first so concurrent workers never
+    see a half-written model.
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = tuple(tf.TensorSpec((None, None), tf.int32, name=name) for name in BERT_INPUTS)
+
+    @tf.function(input_signature=spec)
+    def serving(input_ids, attention_mask, token_type_ids):
+        logits = tf_model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+        ).logits
+        return {"logits": logits}
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(f".{os.getpid()}.tmp")
+    tf2onnx.convert.from_function(
+        serving, input_signature=spec, opset=opset, output_path=str(tmp_path)
+    )
+    os.replace(tmp_path, output_path)
+    print(f"[onnx] exported {output_path}")
+    return output_path
+
+
+class OnnxSequenceClassifier:
+    """
+    onnxruntime session with the calling convention predictor.py uses for the
+    TF model: `model(**tokenizer_outputs).logits`.
+    """
+
+    def __init__(self, model_path: Path):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+        options.inter_op_num_threads = ONNX_INTER_OP_THREADS
+
+        self.model_path = model_path
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {
+            i.name: (np.int64 if "int64" in i.type else np.int32)
+            for i in self.session.get_inputs()
+        }
+
+    def __call__(self, **inputs):
+        feed = {
+            name: np.asarray(inputs[name]).astype(dtype, copy=False)
+            for name, dtype in self._inputs.items()
+            if name in inputs
+        }
+        if "token_type_ids" in self._inputs and "token_type_ids" not in feed:
+            feed["token_type_ids"] = np.zeros_like(feed["input_ids"])
+        logits = self.session.run(["logits"], feed)[0]
+        return SimpleNamespace(logits=logits)
+
+
+def bert_onnx_path(source_stamp: str, name: str = "bert_model_light") -> Path:
+    return ONNX_DIR / f"{name}.{source_stamp}.onnx"
+
+
+def load_bert_onnx(load_tf_model, source_stamp: str, name: str = "bert_model_light") -> OnnxSequenceClassifier:
+    """
+    Serve the BERT classifier through onnxruntime. The first call exports
+    `load_tf_model()` under DATA_DIR/onnx; later calls reuse the export.
+    `source_stamp` (mtime/size of the TF artifact) is part of the file name,
+    so retraining the TF model triggers a fresh export.
+    """
+    model_path = bert_onnx_path(source_stamp, name)
+    if not model_path.exists():
+        export_bert_to_onnx(load_tf_model(), model_path)
+    return OnnxSequenceClassifier(model_path)
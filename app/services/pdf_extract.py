@@ -0,0 +1,152 @@
+"""
+PDF text extraction, run inside the "pdf" process pool.
+
+Backends are pluggable: pypdfium2 (fastest, C++), pdfminer.six and PyPDF2.
+PDF_BACKEND picks one; "auto" uses the first that is installed. Pages are
+read lazily and extraction stops as soon as the Abstract section's end
+(Introduction / Keywords heading) has been seen, so usually only the first
+page is parsed. Only the abstract itself is returned to the models.
+"""
+import io
+import re
+
+from app.config import PDF_BACKEND, PDF_MAX_PAGES
+
+# Headings only: Title-case or UPPER-case, alone on their line or followed by
+# ".", ":", "—" or "–". Body lines like "introduction of a new loss ..." and
+# titles like "Summary statistics for ..." must not match.
+HEADING_TAIL = r"[ \t]*(?:[.:—–][ \t]*|$)"
+# "Abstract", "ABSTRACT.", "Abstract—", "Summary:" at the start of a line
+ABSTRACT_START = re.compile(r"^[ \t]*(?:Abstract|ABSTRACT|Summary|SUMMARY)" + HEADING_TAIL, re.MULTILINE)
+# "1 Introduction", "I. INTRODUCTION", "Keywords:", "Index Terms—" at the start of a line
+ABSTRACT_END = re.compile(
+    r"^[ \t]*(?:(?:\d+|[IVX]+)\.?[ \t]+)?"
+    r"(?:Introduction|INTRODUCTION|Key[ \t]?words|KEY[ \t]?WORDS|Index[ \t]+[Tt]erms|INDEX[ \t]+TERMS)"
+    + HEADING_TAIL,
+    re.MULTILINE,
+)
+MIN_ABSTRACT_CHARS = 100
+
+
+class PdfTextBackend:
+    """Interface: yield the text of each page, lazily, in order."""
+
+    name = "base"
+
+    def iter_pages(self, source):
+        raise NotImplementedError
+
+
+class PdfiumBackend(PdfTextBackend):
+    name = "pypdfium2"
+
+    def iter_pages(self, source):
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(source)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    yield textpage.get_text_range()
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+
+
+class PdfminerBackend(PdfTextBackend):
+    name = "pdfminer"
+
+    def iter_pages(self, source):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LAParams, LTTextContainer
+
+        for page in extract_pages(_as_file(source), laparams=LAParams()):
+            yield "".join(el.get_text() for el in page if isinstance(el, LTTextContainer))
+
+
+class PyPDF2Backend(PdfTextBackend):
+    name = "pypdf2"
+
+    def iter_pages(self, source):
+        from PyPDF2 import PdfReader
+
+        for page in PdfReader(_as_file(source)).pages:
+            yield page.extract_text() or ""
+
+
+BACKENDS = {
+    "pypdfium2": (PdfiumBackend, "pypdfium2"),
+    "pdfminer": (PdfminerBackend, "pdfminer"),
+    "pypdf2": (PyPDF2Backend, "PyPDF2"),
+}
+
+
+def _as_file(source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def get_backend(name: str = PDF_BACKEND) -> PdfTextBackend:
+    if name != "auto":
+        return BACKENDS[name][0]()
+    import importlib.util
+    for backend_cls, module in BACKENDS.values():
+        if importlib.util.find_spec(module) is not None:
+            return backend_cls()
+    raise RuntimeError("No PDF backend installed (pypdfium2, pdfminer.six or PyPDF2)")
+
+
+def find_abstract(text: str, complete: bool = False) -> str | None:
+    """
+    Abstract section of the text read so far. Returns None while the end of
+    the abstract hasn't been seen yet, unless `complete` (no more pages), in
+    which case everything after the heading (or all text) is returned.
+
+    Lines that only start with a heading word are body text:
+
+    >>> text = "Abstract\\n" + "We propose a loss. " * 6 + "This requires the\\nintroduction of a new term.\\n1 Introduction\\n"
+    >>> find_abstract(text).endswith("introduction of a new term.")
+    True
+    >>> text = "Summary statistics for graphs\\nA. Author\\nAbstract: " + "We study graphs. " * 7 + "\\nKeywords: graphs\\n"
+    >>> find_abstract(text).startswith("We study graphs.")
+    True
+    """
+    start = ABSTRACT_START.search(text)
+    body_from = start.end() if start else 0
+
+    for end in ABSTRACT_END.finditer(text, body_from):
+        if not start:
+            # No "Abstract" heading before the first section: keep the front matter
+            return text[:end.start()].strip() or None
+        abstract = text[body_from:end.start()].strip()
+        if len(abstract) >= MIN_ABSTRACT_CHARS:
+            return abstract
+        # Too short: a wrapped line like "introduction of ..." inside the
+        # abstract, not the next heading; try the next match
+    if not complete:
+        return None
+    return text[body_from:].strip()
+
+
+def extract_abstract(source, max_pages: int = PDF_MAX_PAGES, backend: PdfTextBackend = None) -> str:
+    backend = backend or get_backend()
+    text = ""
+    for index, page_text in enumerate(backend.iter_pages(source)):
+        text += page_text + "\n"
+        abstract = find_abstract(text)
+        if abstract:
+            return abstract  # stop before parsing the remaining pages
+        if index + 1 >= max_pages:
+            break
+    return find_abstract(text, complete=True)
+
+
+def extract_pdf_text(source, max_pages: int = PDF_MAX_PAGES) -> str:
+    """
+    Abstract text of a PDF given as raw bytes or a path. Runs inside the
+    "pdf" process pool, so it must stay a picklable module-level function.
+    """
+    return extract_abstract(source, max_pages)
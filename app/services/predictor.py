@@ -1,65 +1,333 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+
 import numpy as np
-import tensorflow as tf
-from keras.preprocessing.sequence import pad_sequences
 
+from app.config import (
+    PREDICT_PARALLEL,
+    PREDICT_CPU_WORKERS,
+    PREDICT_CHUNK_SIZE,
+    MICROBATCH_MODELS,
+    MICROBATCH_MAX_SIZE,
+    MICROBATCH_MAX_WAIT_MS,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_TTL,
+    PREDICTION_CACHE_MONGO,
+    PREDICTION_CACHE_MONGO_TTL,
+    db,
+)
+from app.services.batcher import MicroBatcher
+from app.services.cache import PredictionCache
+from app.services.executor import pools, run_in_pool
+from app.services.loader import TF_MODELS, model_version, tfidf_tokenizer_key
+from app.services.metrics import (
+    MODEL_CALLS,
+    MODEL_DOCUMENTS,
+    MODEL_ERRORS,
+    observe_phase,
+)
+
+
+TFIDF_MODELS = ['SVM','MNB','Random Forest','AdaBoost','KNN','XG_BOOST']
+
+# sklearn/XGBoost release the GIL in native code, so a thread pool gives real
+# overlap. TF models share one dedicated thread so they never contend with
+# each other for the TF runtime's own intra-op threads.
+_cpu_pool = ThreadPoolExecutor(max_workers=PREDICT_CPU_WORKERS, thread_name_prefix="predict-cpu")
+_tf_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict-tf")
+
+
+def _softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+class FeatureSet:
+    """
+    Per-request feature stage over one or more abstracts. Each representation
+    is built the first time a model asks for it and then reused by every other
+    model, so the ALL path vectorizes the text once instead of once per model,
+    and a batch is vectorized in a single call.
+    """
+
+    def __init__(self, abstracts, tokenizers):
+        if isinstance(abstracts, str):
+            abstracts = [abstracts]
+        self.abstracts = list(abstracts)
+        self.tokenizers = tokenizers
+
+    def __len__(self):
+        return len(self.abstracts)
+
+    @cached_property
+    def tfidf(self):
+        return self.tokenizers['TFIDF'].transform(self.abstracts)
+
+    @cached_property
+    def tfidf_dense(self):
+        return self.tfidf.toarray()
+
+    @cached_property
+    def tfidf_compact(self):
+        return self.tokenizers['TFIDF_COMPACT'].transform(self.abstracts)
+
+    @cached_property
+    def tfidf_compact_dense(self):
+        return self.tfidf_compact.toarray()
+
+    @cached_property
+    def nn_sequence(self):
+        from keras.preprocessing.sequence import pad_sequences
+        seq = self.tokenizers["NN"].texts_to_sequences(self.abstracts)
+        return pad_sequences(seq, maxlen=300)
+
+    @cached_property
+    def bert_inputs(self):
+        return self.tokenizers['BERT'](
+            self.abstracts,
+            return_tensors='np',
+            padding=True,
+            truncation=True,
+            max_length=256
+        )
+
+
+# FeatureSet representation each model consumes
+MODEL_FEATURES = {
+    **{key: "tfidf" for key in TFIDF_MODELS},
+    'Feedforward NN': "tfidf_dense",
+    'BiLSTM': "nn_sequence",
+    'BERT': "bert_inputs",
+}
+
+
+def feature_name(model_key):
+    """MODEL_FEATURES entry, switched to the compact TF-IDF where it was built for the model."""
+    feature = MODEL_FEATURES[model_key]
+    if feature.startswith("tfidf") and tfidf_tokenizer_key(model_key) == "TFIDF_COMPACT":
+        return feature.replace("tfidf", "tfidf_compact", 1)
+    return feature
+
+
+def _infer(model_key, model, x_input):
+    """Returns (predicted class indices, confidences or None) for a batch."""
+    confidences = None
+
+    if model_key in TFIDF_MODELS:
+        pred_idx = np.asarray(model.predict(x_input))
+        if hasattr(model, 'predict_proba'):
+            probs = model.predict_proba(x_input)
+            confidences = probs[np.arange(len(pred_idx)), pred_idx]
+
+    elif model_key == 'BERT':
+        # Works for both backends: TF accepts numpy inputs, ONNX returns numpy logits
+        logits = np.asarray(model(**x_input).logits)
+        probs = _softmax(logits)
+        pred_idx = np.argmax(probs, axis=1)
+        confidences = probs[np.arange(len(pred_idx)), pred_idx]
+
+    else:  # Feedforward NN / BiLSTM
+        y_probs = model.predict(x_input, verbose=0)
+        pred_idx = np.argmax(y_probs, axis=1)
+        confidences = y_probs[np.arange(len(pred_idx)), pred_idx]
+
+    return pred_idx, confidences
+
+
+def _bert_chunk(x_input, start, stop):
+    chunk = {name: np.asarray(values)[start:stop] for name, values in x_input.items()}
+    # Drop the padding this chunk only has because of longer abstracts
+    # elsewhere in the batch (the tokenizer pads on the right)
+    if "attention_mask" in chunk:
+        length = max(int(chunk["attention_mask"].sum(axis=1).max()), 1)
+        chunk = {name: values[:, :length] for name, values in chunk.items()}
+    return chunk
 
-def predict_label(abstract, model_name, models, tokenizers, label_encoder):
-    def predict_one(model_key):
+
+def _infer_chunked(model_key, model, x_input):
+    """
+    _infer in PREDICT_CHUNK_SIZE pieces for the neural models, whose
+    activations (BERT attention in particular) grow with the batch. Sparse
+    TF-IDF input still goes to the classifier in one call.
+    """
+    n = len(x_input["input_ids"]) if model_key == 'BERT' else x_input.shape[0]
+    if model_key in TFIDF_MODELS or n <= PREDICT_CHUNK_SIZE:
+        return _infer(model_key, model, x_input)
+
+    pred_idx, confidences = [], []
+    for start in range(0, n, PREDICT_CHUNK_SIZE):
+        stop = start + PREDICT_CHUNK_SIZE
+        chunk = _bert_chunk(x_input, start, stop) if model_key == 'BERT' else x_input[start:stop]
+        chunk_idx, chunk_conf = _infer(model_key, model, chunk)
+        pred_idx.append(chunk_idx)
+        confidences.append(chunk_conf)
+    return np.concatenate(pred_idx), np.concatenate(confidences)
+
+
+def predict_batch(model_key, features, models, label_encoder):
+    """Run one model over every abstract in `features` (neural models in chunks)."""
+    if model_key not in MODEL_FEATURES:
+        raise ValueError(f"Unsupported model: {model_key}")
+
+    MODEL_CALLS.labels(model_key).inc()
+    try:
         model = models[model_key]
-        confidence = None
-
-        if model_key in ['SVM','MNB','Random Forest','AdaBoost','KNN','XG_BOOST']:
-            x_input = tokenizers['TFIDF'].transform([abstract])
-            pred_idx = model.predict(x_input)[0]
-            if hasattr(model, 'predict_proba'):
-                confidence = model.predict_proba(x_input)[0][pred_idx]
-
-        elif model_key == 'Feedforward NN':
-            x_input_dense = tokenizers['TFIDF'].transform([abstract]).toarray()
-            y_probs = model.predict(x_input_dense, verbose=0)[0]
-            pred_idx = np.argmax(y_probs)
-            confidence = y_probs[pred_idx]
-
-        elif model_key == 'BiLSTM':
-            seq = tokenizers["NN"].texts_to_sequences([abstract])
-            padded_seq = pad_sequences(seq, maxlen=300)
-            y_probs = model.predict(padded_seq, verbose=0)[0]
-            pred_idx = np.argmax(y_probs)
-            confidence = y_probs[pred_idx]
-
-        elif model_key == 'BERT':
-            bert_inputs = tokenizers['BERT'](
-                abstract,
-                return_tensors='tf',
-                padding=True,
-                truncation=True,
-                max_length=256
-            )
-            logits = model(**bert_inputs).logits
-            probs = tf.nn.softmax(logits, axis=1).numpy()[0]
-            pred_idx = np.argmax(probs)
-            confidence = probs[pred_idx]
-
-        else:
-            raise ValueError(f"Unsupported model: {model_key}")
-
-        label = label_encoder.inverse_transform([pred_idx])[0]
-        return label, round(confidence, 4) if confidence else None
+        with observe_phase(model_key, "vectorize"):
+            x_input = getattr(features, feature_name(model_key))
+        with observe_phase(model_key, "inference"):
+            pred_idx, confidences = _infer_chunked(model_key, model, x_input)
+        with observe_phase(model_key, "decode"):
+            labels = label_encoder.inverse_transform(pred_idx)
+            if confidences is None:
+                results = [(label, None) for label in labels]
+            else:
+                results = [
+                    (label, round(float(conf), 4) if conf else None)
+                    for label, conf in zip(labels, confidences)
+                ]
+    except Exception:
+        MODEL_ERRORS.labels(model_key).inc()
+        raise
+
+    MODEL_DOCUMENTS.labels(model_key).inc(len(results))
+    return results
+
+
+def _run_models(model_keys, features, models, label_encoder, parallel):
+    """
+    Run several models over the same features. Returns {model: [result, ...]}
+    where each result is {"label", "confidence"} or {"error"}, one per abstract.
+    """
+    def run_one(model_key):
+        try:
+            return [
+                {"label": label, "confidence": conf}
+                for label, conf in predict_batch(model_key, features, models, label_encoder)
+            ]
+        except Exception as e:
+            return [{"error": str(e)}] * len(features)
+
+    if not (parallel if parallel is not None else PREDICT_PARALLEL):
+        return {key: run_one(key) for key in model_keys}
+
+    # Build the shared TF-IDF matrices up front so pool threads don't race
+    # to compute them
+    shared = {
+        feature_name(key).removesuffix("_dense")
+        for key in model_keys
+        if MODEL_FEATURES.get(key, "").startswith("tfidf")
+    }
+    with observe_phase("shared", "vectorize"):
+        for name in sorted(shared):
+            try:
+                getattr(features, name)
+            except Exception:
+                pass  # each model reports the failure itself
+    futures = {
+        key: (_tf_pool if key in TF_MODELS else _cpu_pool).submit(run_one, key)
+        for key in model_keys
+    }
+    return {key: future.result() for key, future in futures.items()}
+
+
+def predict_label(abstract, model_name, models, tokenizers, label_encoder, parallel=None):
+    features = FeatureSet(abstract, tokenizers)
 
     # If ALL: Run all models
     if model_name == "ALL":
-        results = {}
-        for key in models:
-            try:
-                label, conf = predict_one(key)
-                results[key] = {"label": label, "confidence": conf}
-            except Exception as e:
-                results[key] = {"error": str(e)}
-        return results, None
+        results = _run_models(list(models), features, models, label_encoder, parallel)
+        return {key: rows[0] for key, rows in results.items()}, None
 
     # If not ALL: Run single model
-    return predict_one(model_name)
+    return predict_batch(model_name, features, models, label_encoder)[0]
 
 
+def predict_labels_batch(abstracts, model_name, models, tokenizers, label_encoder, parallel=None):
+    """
+    Batch counterpart of predict_label. Every model sees the whole batch in
+    one vectorized call. `model_name` is a model, "ALL", or a list of models.
+    Returns one entry per abstract: a (label, confidence) tuple for a single
+    model, or a {model: result} dict for ALL / a list.
+    """
+    features = FeatureSet(abstracts, tokenizers)
 
+    if model_name == "ALL" or isinstance(model_name, (list, tuple)):
+        model_keys = list(models) if model_name == "ALL" else list(model_name)
+        results = _run_models(model_keys, features, models, label_encoder, parallel)
+        return [
+            {key: rows[i] for key, rows in results.items()}
+            for i in range(len(features))
+        ]
 
+    return predict_batch(model_name, features, models, label_encoder)
+
+
+_batchers = {}
+
+
+def _get_batcher(model_key, models, tokenizers, label_encoder):
+    batcher = _batchers.get(model_key)
+    if batcher is None:
+        batcher = MicroBatcher(
+            lambda abstracts: predict_batch(
+                model_key, FeatureSet(abstracts, tokenizers), models, label_encoder
+            ),
+            max_batch_size=MICROBATCH_MAX_SIZE,
+            max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+            executor=_tf_pool,
+            name=model_key,
+        )
+        _batchers[model_key] = batcher
+    return batcher
+
+
+prediction_cache = PredictionCache(
+    maxsize=PREDICTION_CACHE_SIZE,
+    ttl=PREDICTION_CACHE_TTL,
+    collection=db["prediction_cache"] if PREDICTION_CACHE_MONGO else None,
+    mongo_ttl=PREDICTION_CACHE_MONGO_TTL,
+)
+
+
+async def _predict_uncached(abstract, model_name, models, tokenizers, label_encoder):
+    if model_name in MICROBATCH_MODELS:
+        batcher = _get_batcher(model_name, models, tokenizers, label_encoder)
+        # Batched requests still take a model-pool slot, so a burst gets 503s
+        # instead of growing the batcher's queue without bound
+        with pools["model"].admit():
+            return await batcher.submit(abstract)
+
+    return await run_in_pool(
+        "model", predict_label, abstract, model_name, models, tokenizers, label_encoder
+    )
+
+
+async def predict_label_async(abstract, model_name, models, tokenizers, label_encoder, use_cache=True):
+    """
+    Async entry point for the API. Results are served from prediction_cache
+    when the same abstract was already classified by the same model version.
+    Single-model requests for the TF models in MICROBATCH_MODELS are merged
+    with other in-flight requests into one padded forward pass; everything
+    else runs predict_label in the bounded model pool.
+    """
+    if not use_cache:
+        return await _predict_uncached(abstract, model_name, models, tokenizers, label_encoder)
+
+    key = PredictionCache.make_key(abstract, model_name, model_version(model_name))
+    cached = await prediction_cache.get(key)
+    if cached is not None:
+        return tuple(cached)
+
+    output, confidence = await _predict_uncached(abstract, model_name, models, tokenizers, label_encoder)
+    if model_name == "ALL" and any("error" in row for row in output.values()):
+        return output, confidence  # don't pin transient failures in the cache
+    # Plain str/float so the Mongo tier can store it
+    if model_name == "ALL":
+        output = {
+            name: {"label": str(row["label"]), "confidence": row["confidence"]}
+            for name, row in output.items()
+        }
+    else:
+        output = str(output)
+    await prediction_cache.set(key, [output, confidence])
+    return output, confidence
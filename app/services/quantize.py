@@ -0,0 +1,153 @@
+"""
+Int8 variants of the neural classifiers.
+
+Build once, offline:
+
+    python -m app.services.quantize                # all three
+    python -m app.services.quantize BERT BiLSTM    # a subset
+
+BERT is dynamically quantized with onnxruntime (int8 weights, int8 matmuls at
+run time). The Keras models go through TFLite dynamic-range quantization.
+Outputs are written next to the fp32 artifacts and picked up by the loader
+for every model listed in QUANTIZED_MODELS. Each build records the mtime/size
+of its fp32 source in a `.source` file beside it; after a retrain the old
+int8 build is refused until it is rebuilt.
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+
+from app.config import DATA_DIR
+from app.services.onnx_backend import ONNX_DIR, OnnxSequenceClassifier
+
+QUANTIZED_ARTIFACTS = {
+    "BERT": ONNX_DIR / "bert_model_light.int8.onnx",
+    "BiLSTM": DATA_DIR / "bilstm_model_light.int8.tflite",
+    "Feedforward NN": DATA_DIR / "feedforward_model_light.int8.tflite",
+}
+
+KERAS_SOURCES = {
+    "BiLSTM": "bilstm_model_light.h5",
+    "Feedforward NN": "feedforward_model_light.h5",
+}
+
+# fp32 artifact (under DATA_DIR) each int8 build is converted from
+QUANTIZED_SOURCES = {"BERT": "bert_model_light", **KERAS_SOURCES}
+
+
+def source_stamp(name: str) -> str:
+    from app.services.loader import _artifact_stamp
+    return _artifact_stamp(DATA_DIR / QUANTIZED_SOURCES[name])
+
+
+def _stamp_path(name: str):
+    path = QUANTIZED_ARTIFACTS[name]
+    return path.with_name(f"{path.name}.source")
+
+
+def is_current(name: str) -> bool:
+    """Whether the int8 build of `name` was made from its current fp32 artifact."""
+    try:
+        return _stamp_path(name).read_text().strip() == source_stamp(name)
+    except FileNotFoundError:
+        return False
+
+
+class TFLiteModel:
+    """
+    TFLite interpreter exposing the `model.predict(x, verbose=0)` call the
+    predictor uses for Keras models. The interpreter is not thread-safe, so
+    calls are serialized.
+    """
+
+    def __init__(self, model_path):
+        import tensorflow as tf
+
+        self.model_path = model_path
+        self.interpreter = tf.lite.Interpreter(model_path=str(model_path))
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._shape = None
+        self._lock = threading.Lock()
+
+    def predict(self, x, verbose=0):
+        x = np.asarray(x, dtype=self._input["dtype"])
+        with self._lock:
+            if self._shape != x.shape:
+                self.interpreter.resize_tensor_input(self._input["index"], x.shape)
+                self.interpreter.allocate_tensors()
+                self._shape = x.shape
+            self.interpreter.set_tensor(self._input["index"], x)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output["index"]).copy()
+
+
+def quantize_bert():
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from app.services.loader import _artifact_stamp, _load_bert_model
+    from app.services.onnx_backend import bert_onnx_path, export_bert_to_onnx
+
+    fp32_path = bert_onnx_path(_artifact_stamp(DATA_DIR / "bert_model_light"))
+    if not fp32_path.exists():
+        export_bert_to_onnx(_load_bert_model(), fp32_path)
+
+    out_path = QUANTIZED_ARTIFACTS["BERT"]
+    tmp_path = out_path.with_suffix(f".{os.getpid()}.tmp")
+    quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def quantize_keras(name: str):
+    import tensorflow as tf
+    from keras.models import load_model
+
+    model = load_model(DATA_DIR / KERAS_SOURCES[name])
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    # LSTM layers need the TF-op fallback and unlowered tensor lists
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS,
+        tf.lite.OpsSet.SELECT_TF_OPS,
+    ]
+    converter._experimental_lower_tensor_list_ops = False
+
+    out_path = QUANTIZED_ARTIFACTS[name]
+    out_path.write_bytes(converter.convert())
+    return out_path
+
+
+def build_quantized(names=None):
+    built = {}
+    for name in names or QUANTIZED_ARTIFACTS:
+        if name not in QUANTIZED_ARTIFACTS:
+            raise ValueError(f"No quantized variant for model: {name}")
+        stamp = source_stamp(name)
+        path = quantize_bert() if name == "BERT" else quantize_keras(name)
+        _stamp_path(name).write_text(stamp)
+        size_mb = path.stat().st_size / 1e6
+        print(f"[quantize] {name} -> {path} ({size_mb:.1f} MB)")
+        built[name] = path
+    return built
+
+
+def load_quantized(name: str):
+    path = QUANTIZED_ARTIFACTS[name]
+    if not path.exists():
+        raise FileNotFoundError(
+            f"{path} not found; build it with `python -m app.services.quantize {name}`"
+        )
+    if not is_current(name):
+        raise RuntimeError(
+            f"{path} was not built from the current {QUANTIZED_SOURCES[name]}; "
+            f"rebuild it with `python -m app.services.quantize {name}`"
+        )
+    if name == "BERT":
+        return OnnxSequenceClassifier(path)
+    return TFLiteModel(path)
+
+
+if __name__ == "__main__":
+    build_quantized(sys.argv[1:] or None)
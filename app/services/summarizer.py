@@ -4,6 +4,7 @@ from app.config import GEMINI_API_KEY
 from transformers import pipeline
 import logging
 from google.genai import types
+from app.services.metrics import instrument_service, record_service_error
 import textwrap
 import os
 # import nltk
@@ -49,6 +50,7 @@ def _chunk_sentences(text: str, max_chars: int = 2200, overlap_sents: int = 1):
         chunks.append(" ".join(cur))
     return chunks
 
+@instrument_service("summarize", "pegasus")
 def summarize_with_pegasus(text: str, bullets: int = 4) -> str:
     """Summarize academic text into concise bullet points using distilled Pegasus."""
     text = text.strip()
@@ -100,6 +102,7 @@ def chunk_text(text: str, chunk_size: int = 1500) -> list:
 def format_as_bullets(paragraphs: list) -> str:
     return "\n".join([f"• {sent.strip().rstrip('.')}" for sent in paragraphs if sent.strip()])
 
+@instrument_service("summarize", "bart")
 def summarize_with_bart(text: str) -> str:
     try:
         if not extractive_summarizer:
@@ -130,8 +133,10 @@ def summarize_with_bart(text: str) -> str:
 
     except Exception as e:
         logging.error(f"[BART Summarizer Error] {e}")
+        record_service_error("summarize", "bart")
         return "Extractive summarization failed."
     
+@instrument_service("summarize", "gemini")
 def summarize_with_gemini(text: str) -> str:
     prompt = f"""Assume you are an expert researcher. Now summarize the following academic abstract in 3-4 bullet points.
       Make each point as concise as possible:
@@ -152,4 +157,5 @@ def summarize_with_gemini(text: str) -> str:
         return response.text.strip()
     except Exception as e:
         print("[Gemini Keyword Error]", e)
+        record_service_error("summarize", "gemini")
         return "Gemini summarization failed."
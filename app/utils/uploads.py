@@ -0,0 +1,97 @@
+# app/utils/uploads.py
+import hashlib
+import os
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import UPLOAD_MAX_BYTES, UPLOAD_SPOOL_THRESHOLD
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class SpooledUpload:
+    """
+    An upload copied chunk by chunk: kept in memory while small, moved to a
+    named temp file once it passes the spool threshold. The sha256 is computed
+    on the way through, so nothing ever needs the whole file in the heap.
+    """
+
+    def __init__(self, memory_threshold: int):
+        self.memory_threshold = memory_threshold
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = None
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        self._hash.update(chunk)
+        if self._file is None and self.size > self.memory_threshold:
+            self._file = tempfile.NamedTemporaryFile(delete=False, suffix=".upload")
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer += chunk
+
+    def finish(self):
+        if self._file is not None:
+            self._file.flush()
+            self._file.close()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def on_disk(self) -> bool:
+        return self._file is not None
+
+    def source(self):
+        """Bytes for small uploads, a file path for spooled ones (both picklable)."""
+        return self._file.name if self._file is not None else bytes(self._buffer)
+
+    def path(self) -> str:
+        """A file path to the upload, spooling it to disk first if needed."""
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile(delete=False, suffix=".upload")
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+            self.finish()
+        return self._file.name
+
+    def close(self):
+        self._buffer = bytearray()
+        if self._file is not None:
+            try:
+                os.remove(self._file.name)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES,
+                       memory_threshold: int = UPLOAD_SPOOL_THRESHOLD) -> SpooledUpload:
+    """Copy an UploadFile into a SpooledUpload, rejecting it with 413 past max_bytes."""
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File exceeds {max_bytes // (1024 * 1024)} MB limit.")
+
+    spooled = SpooledUpload(memory_threshold)
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            if spooled.size + len(chunk) > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File exceeds {max_bytes // (1024 * 1024)} MB limit.")
+            spooled.write(chunk)
+        spooled.finish()
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled
+
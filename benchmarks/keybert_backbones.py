@@ -0,0 +1,119 @@
+"""
+Keyword quality and throughput of each KeyBERT backbone against mpnet.
+
+    python -m benchmarks.keybert_backbones arxiv-metadata-oai-snapshot.json \
+        --backbones mpnet minilm minilm-onnx minilm-onnx-int8 --limit 500 --out bench/keybert.json
+
+Every backbone extracts keywords for the same abstracts through
+extract_keywords_keybert_batch, in its own process (so peak_rss_mb is that
+backbone's alone). Each run starts with an empty phrase cache in a temp dir. "cold" docs/sec encodes every candidate; "warm" repeats the
+run with the cache filled. Overlap compares top-n keywords with the
+reference backbone, per abstract, averaged:
+  - jaccard: |A ∩ R| / |A ∪ R|
+  - recall: |A ∩ R| / |R|, the share of reference keywords recovered
+"""
+import argparse
+import json
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from app.services.arxiv import clean_abstract, iter_arxiv_records
+from app.services.keyword_extractor import KeyBERTBackbone, extract_keywords_keybert_batch
+from benchmarks.models import git_commit, peak_rss_mb, run_isolated
+
+
+def _extract(model, abstracts, top_n, batch_size):
+    keywords = []
+    start = time.perf_counter()
+    for i in range(0, len(abstracts), batch_size):
+        keywords += extract_keywords_keybert_batch(abstracts[i:i + batch_size], top_n, model=model)
+    return keywords, time.perf_counter() - start
+
+
+def overlap(keywords, reference):
+    jaccard, recall = [], []
+    for mine, ref in zip(keywords, reference):
+        mine, ref = set(mine), set(ref)
+        if not ref and not mine:
+            continue
+        jaccard.append(len(mine & ref) / len(mine | ref))
+        recall.append(len(mine & ref) / len(ref) if ref else 0.0)
+    return {
+        "jaccard": round(float(np.mean(jaccard)), 4) if jaccard else None,
+        "recall": round(float(np.mean(recall)), 4) if recall else None,
+    }
+
+
+def bench_backbone(name, abstracts, top_n, batch_size):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t0 = time.perf_counter()
+        model = KeyBERTBackbone(name, cache_dir=Path(cache_dir))
+        load_s = time.perf_counter() - t0
+
+        try:
+            keywords, cold = _extract(model, abstracts, top_n, batch_size)
+            _, warm = _extract(model, abstracts, top_n, batch_size)
+        finally:
+            model.phrase_cache.close()  # before the temp dir goes away
+        return keywords, {
+            "model": model.spec["model"],
+            "backend": model.spec.get("backend", "torch"),
+            "dim": model.embedder.get_sentence_embedding_dimension(),
+            "load_s": round(load_s, 2),
+            "cold_docs_per_sec": round(len(abstracts) / cold, 2),
+            "warm_docs_per_sec": round(len(abstracts) / warm, 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+
+def run(path, backbones, reference, limit, sample_every, top_n, batch_size):
+    abstracts = [
+        clean_abstract(record["abstract"])
+        for _, record in iter_arxiv_records(path, limit=limit, sample_every=sample_every)
+    ]
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "dataset": str(path),
+        "docs": len(abstracts),
+        "top_n": top_n,
+        "batch_size": batch_size,
+        "reference": reference,
+        "results": {},
+    }
+
+    # Reference first, so every other backbone can be compared to it
+    order = [reference] + [name for name in backbones if name != reference]
+    reference_keywords = None
+    for name in order:
+        keywords, result = run_isolated(bench_backbone, name, abstracts, top_n, batch_size)
+        if reference_keywords is None:
+            reference_keywords = keywords
+        result.update(overlap(keywords, reference_keywords))
+        report["results"][name] = result
+        print(f"{name:>18} {result}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", help="arXiv metadata JSON-lines file")
+    parser.add_argument("--backbones", nargs="+", default=["mpnet", "minilm", "minilm-onnx", "minilm-onnx-int8"])
+    parser.add_argument("--reference", default="mpnet")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--sample-every", type=int, default=1)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args.data, args.backbones, args.reference, args.limit, args.sample_every,
+                 args.top_n, args.batch_size)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.out}")
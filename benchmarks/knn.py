@@ -0,0 +1,69 @@
+"""
+Agreement and speed of the IVF KNN index against the original brute-force model.
+
+    python -m benchmarks.knn arxiv-metadata-oai-snapshot.json --limit 2000 --probes 1 4 8 16
+
+Both models classify the same TF-IDF vectors. For each n_probe the report
+gives the agreement rate with the original predictions, the overlap of the
+returned neighbour sets (recall@k), and docs/sec for both backends.
+"""
+import argparse
+import json
+import time
+
+import joblib
+import numpy as np
+
+from app.config import DATA_DIR
+from app.services.arxiv import clean_abstract, iter_arxiv_records
+from app.services.knn_index import KNN_INDEX, KNN_SOURCE
+from app.services.loader import tokenizers
+
+
+def _timed(fn, X):
+    start = time.perf_counter()
+    result = fn(X)
+    return result, X.shape[0] / (time.perf_counter() - start)
+
+
+def run(path, limit, probes):
+    abstracts = [clean_abstract(r["abstract"]) for _, r in iter_arxiv_records(path, limit=limit)]
+    X = tokenizers["TFIDF"].transform(abstracts)
+
+    brute = joblib.load(DATA_DIR / KNN_SOURCE)
+    index = joblib.load(DATA_DIR / KNN_INDEX)
+
+    brute_pred, brute_dps = _timed(brute.predict, X)
+    _, brute_neighbours = brute.kneighbors(X)
+    report = {"docs": X.shape[0], "brute_docs_per_sec": round(brute_dps, 1), "ivf": {}}
+    print(f"brute: {brute_dps:.1f} docs/s")
+
+    for n_probe in probes:
+        index.n_probe = n_probe
+        ivf_pred, ivf_dps = _timed(index.predict, X)
+        _, ivf_neighbours = index.kneighbors(X)
+        recall = np.mean([
+            len(set(a) & set(b)) / len(a) for a, b in zip(brute_neighbours, ivf_neighbours)
+        ])
+        report["ivf"][str(n_probe)] = {
+            "agreement": round(float(np.mean(brute_pred == ivf_pred)), 4),
+            "neighbour_recall": round(float(recall), 4),
+            "docs_per_sec": round(ivf_dps, 1),
+            "speedup": round(ivf_dps / brute_dps, 2),
+        }
+        print(f"n_probe={n_probe}: {report['ivf'][str(n_probe)]}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", help="arXiv metadata JSON-lines file")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--probes", nargs="+", type=int, default=[1, 4, 8, 16])
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    report = run(args.data, args.limit, args.probes)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
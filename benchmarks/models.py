@@ -0,0 +1,142 @@
+"""
+Throughput / latency / accuracy of every classifier over an arXiv sample.
+
+    python -m benchmarks.models arxiv-metadata-oai-snapshot.json \
+        --limit 1000 --sample-every 50 --out bench/models.json
+
+Each model is run through predict_labels_batch at batch sizes 1, 8 and 64.
+For each model and batch size the report has docs/sec and p50/p95 latency
+per call. Every model is benchmarked in a fresh interpreter, so its
+peak_rss_mb covers that model alone (plus the imports every run shares);
+model_rss_mb is the growth over the interpreter's RSS before the model was
+loaded. It also has accuracy: the
+predicted label counts as correct if it is one of the record's
+`categories`. Accuracy is computed over records with at least one
+category the label encoder knows.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from app.config import BERT_BACKEND, QUANTIZED_MODELS
+from app.services.arxiv import clean_abstract, iter_arxiv_records, matching_label
+from app.services.loader import models, tokenizers, get_label_encoder
+from app.services.predictor import predict_labels_batch
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_isolated(fn, *args):
+    """
+    fn(*args) in a fresh interpreter, so peak_rss_mb() inside it covers that
+    run alone and nothing it loads outlives it. `fn` must be importable.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def bench_model(model_name, abstracts, categories, label_encoder, batch_size):
+    latencies, predicted = [], []
+    start = time.perf_counter()
+    for i in range(0, len(abstracts), batch_size):
+        t0 = time.perf_counter()
+        rows = predict_labels_batch(
+            abstracts[i:i + batch_size], model_name, models, tokenizers, label_encoder
+        )
+        latencies.append(time.perf_counter() - t0)
+        predicted += [label for label, _ in rows]
+    elapsed = time.perf_counter() - start
+
+    scored = [
+        str(label) in cats.split()
+        for label, cats in zip(predicted, categories)
+        if matching_label(cats, label_encoder.classes_)
+    ]
+    return {
+        "docs": len(abstracts),
+        "docs_per_sec": round(len(abstracts) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "accuracy": round(float(np.mean(scored)), 4) if scored else None,
+        "scored_docs": len(scored),
+    }
+
+
+def bench_model_isolated(model_name, abstracts, categories, batch_sizes):
+    """Every batch size for one model; run it through run_isolated()."""
+    label_encoder = get_label_encoder()
+    baseline_mb = peak_rss_mb()
+
+    # Load (and warm) outside the timed loop
+    models[model_name]
+    predict_labels_batch(abstracts[:1], model_name, models, tokenizers, label_encoder)
+
+    results = {}
+    for batch_size in batch_sizes:
+        result = bench_model(model_name, abstracts, categories, label_encoder, batch_size)
+        result["model_rss_mb"] = round(result["peak_rss_mb"] - baseline_mb, 1)
+        results[str(batch_size)] = result
+        print(f"{model_name:>15} bs={batch_size:<3} {result}")
+    return results
+
+
+def run(path, model_names, batch_sizes, limit, sample_every):
+    records = [record for _, record in iter_arxiv_records(path, limit=limit, sample_every=sample_every)]
+    abstracts = [clean_abstract(r["abstract"]) for r in records]
+    categories = [r.get("categories", "") for r in records]
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "bert_backend": BERT_BACKEND,
+        "quantized_models": QUANTIZED_MODELS,
+        "dataset": str(path),
+        "docs": len(abstracts),
+        "results": {},
+    }
+    for model_name in model_names:
+        report["results"][model_name] = run_isolated(
+            bench_model_isolated, model_name, abstracts, categories, batch_sizes
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", help="arXiv metadata JSON-lines file")
+    parser.add_argument("--models", nargs="+", default=list(models))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 64])
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--sample-every", type=int, default=1)
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args.data, args.models, args.batch_sizes, args.limit, args.sample_every)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.out}")
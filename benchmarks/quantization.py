@@ -0,0 +1,91 @@
+"""
+Accuracy / latency of the int8 models against their fp32 originals.
+
+    python -m benchmarks.quantization data/eval.jsonl --limit 2000 --out quant.json
+
+The input is JSON lines with an "abstract" and either a "label" or an arXiv
+"categories" string. Only rows whose label is one of the label encoder's
+classes are scored.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.services.arxiv import matching_label
+from app.services.loader import tokenizers, get_label_encoder, load_model_variant
+from app.services.predictor import FeatureSet, predict_batch
+from app.services.quantize import QUANTIZED_ARTIFACTS
+
+
+def load_labeled(path, classes, limit=None):
+    classes = set(classes)
+    abstracts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            label = row.get("label")
+            if label is None:
+                label = matching_label(row.get("categories"), classes)
+            if label not in classes or not row.get("abstract"):
+                continue
+            abstracts.append(row["abstract"])
+            labels.append(label)
+            if limit and len(abstracts) >= limit:
+                break
+    return abstracts, labels
+
+
+def _evaluate(name, model, abstracts, labels, label_encoder, batch_size):
+    predicted, elapsed = [], 0.0
+    for start in range(0, len(abstracts), batch_size):
+        features = FeatureSet(abstracts[start:start + batch_size], tokenizers)
+        t0 = time.perf_counter()
+        rows = predict_batch(name, features, {name: model}, label_encoder)
+        elapsed += time.perf_counter() - t0
+        predicted += [label for label, _ in rows]
+    accuracy = float(np.mean([p == y for p, y in zip(predicted, labels)]))
+    return predicted, accuracy, len(abstracts) / elapsed if elapsed else 0.0
+
+
+def run(path, names, limit=None, batch_size=32):
+    label_encoder = get_label_encoder()
+    abstracts, labels = load_labeled(path, label_encoder.classes_, limit)
+    if not abstracts:
+        raise SystemExit("No rows with labels known to the label encoder.")
+
+    report = {"samples": len(abstracts), "batch_size": batch_size, "models": {}}
+    for name in names:
+        fp32_pred, fp32_acc, fp32_dps = _evaluate(
+            name, load_model_variant(name), abstracts, labels, label_encoder, batch_size
+        )
+        int8_pred, int8_acc, int8_dps = _evaluate(
+            name, load_model_variant(name, quantized=True), abstracts, labels, label_encoder, batch_size
+        )
+        report["models"][name] = {
+            "fp32_accuracy": round(fp32_acc, 4),
+            "int8_accuracy": round(int8_acc, 4),
+            "accuracy_delta": round(int8_acc - fp32_acc, 4),
+            "agreement": round(float(np.mean([a == b for a, b in zip(fp32_pred, int8_pred)])), 4),
+            "fp32_docs_per_sec": round(fp32_dps, 1),
+            "int8_docs_per_sec": round(int8_dps, 1),
+            "int8_artifact_mb": round(QUANTIZED_ARTIFACTS[name].stat().st_size / 1e6, 1),
+        }
+        print(name, report["models"][name])
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data")
+    parser.add_argument("--models", nargs="+", default=list(QUANTIZED_ARTIFACTS))
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    report = run(args.data, args.models, args.limit, args.batch_size)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
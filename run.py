@@ -4,4 +4,10 @@ import os
 print("CWD:", os.getcwd())
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    from app.config import SERVER_MODE, WEB_WORKERS
+
+    if SERVER_MODE == "prefork":
+        from app.prefork import serve_prefork
+        serve_prefork(host="0.0.0.0", port=8000, workers=WEB_WORKERS)
+    else:
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)